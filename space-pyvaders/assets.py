@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+import pygame
+from constants import FONT_PATH, SOUND_DIR
+
+# name -> (file in SOUND_DIR, base volume before the SFX volume setting)
+SOUNDS = {
+    "shoot": ("shoot.wav", 0.3),
+    "explosion": ("explosion.wav", 1.0),
+    "enemy_killed": ("invaderkilled.wav", 1.0),
+    "enemy_move_1": ("fastinvader1.wav", 1.0),
+    "enemy_move_2": ("fastinvader2.wav", 1.0),
+    "enemy_move_3": ("fastinvader3.wav", 1.0),
+    "enemy_move_4": ("fastinvader4.wav", 1.0),
+    "level_complete": ("level_complete.mp3", 1.0),
+}
+ENEMY_MOVE_SOUNDS = ("enemy_move_1", "enemy_move_2", "enemy_move_3", "enemy_move_4")
+
+
+class AssetManager:
+    # Fonts and sounds, each loaded once on first use and then shared.
+    # Sounds can also be decoded ahead of time on a background thread, which
+    # starts once the title screen is up; anything asked for before the
+    # thread reached it is loaded on the spot.
+
+    def __init__(self):
+        self.fonts = {}
+        self.sounds = {}
+        self.lock = threading.Lock()
+        self.audio = None  # None until the mixer has been tried
+        self.volume_scale = 1.0
+        self.preload_thread = None
+        self.preload_ms = None
+        self.started_at = None  # perf_counter() at launch, set by main
+        self.cold_start_ms = None
+
+    def init(self):
+        # Only what the game uses; the mixer is left until sound is needed
+        if not pygame.display.get_init():
+            pygame.display.init()
+        if not pygame.font.get_init():
+            pygame.font.init()
+
+    def init_audio(self):
+        if self.audio is None:
+            try:
+                pygame.mixer.init()
+                self.audio = True
+            except pygame.error:
+                print("Warning: No audio device available, sound is disabled")
+                self.audio = False
+        return self.audio
+
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(FONT_PATH, size)
+        return font
+
+    def sound(self, name):
+        # None when there is no audio or the file would not load
+        if name in self.sounds:
+            return self.sounds[name]
+        with self.lock:
+            if name not in self.sounds:
+                self.sounds[name] = self.load_sound(name)
+        return self.sounds[name]
+
+    def load_sound(self, name):
+        if not self.init_audio():
+            return None
+        filename, volume = SOUNDS[name]
+        try:
+            sound = pygame.mixer.Sound(os.path.join(SOUND_DIR, filename))
+        except pygame.error:
+            print(f"Warning: Unable to load sound file: {filename}")
+            return None
+        sound.set_volume(volume * self.volume_scale)
+        return sound
+
+    def start_preload(self):
+        if self.preload_thread is None:
+            self.init_audio()  # On this thread, before any decoding starts
+            self.preload_thread = threading.Thread(target=self.preload, daemon=True)
+            self.preload_thread.start()
+
+    def preload(self):
+        start = time.perf_counter()
+        for name in SOUNDS:
+            self.sound(name)
+        self.preload_ms = (time.perf_counter() - start) * 1000
+
+    def first_frame_shown(self):
+        # The title screen calls this once each time it has drawn its first
+        # frame; only the first call of the process is timed
+        if self.cold_start_ms is None and self.started_at is not None:
+            self.cold_start_ms = (time.perf_counter() - self.started_at) * 1000
+            print(f"Cold start: {self.cold_start_ms:.0f} ms to first frame")
+        self.start_preload()
+
+    def set_sfx_volume(self, volume):
+        self.volume_scale = volume / 10.0
+        with self.lock:
+            for name, sound in self.sounds.items():
+                if sound:
+                    sound.set_volume(SOUNDS[name][1] * self.volume_scale)
+
+
+ASSETS = AssetManager()
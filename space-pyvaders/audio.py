@@ -0,0 +1,118 @@
+import pygame
+from assets import ASSETS
+
+CHANNELS = 8
+
+# category -> (most voices at once, priority); higher priority wins a channel.
+# A category also starts at most its voice count of sounds per tick.
+CATEGORIES = {
+    "march": (1, 3),
+    "shot": (2, 1),
+    "hit": (3, 2),
+    "explosion": (1, 4),
+    "jingle": (1, 5),
+}
+SOUND_CATEGORIES = {
+    "shoot": "shot",
+    "enemy_killed": "hit",
+    "explosion": "explosion",
+    "level_complete": "jingle",
+    "enemy_move_1": "march",
+    "enemy_move_2": "march",
+    "enemy_move_3": "march",
+    "enemy_move_4": "march",
+}
+
+
+class ChannelPool:
+    # Plays every sound effect on a fixed set of mixer channels. The march
+    # beat has channel 0 to itself, reserved so nothing else can take it.
+    # Other sounds are limited to their category's voice count, replacing
+    # the oldest voice of their own category when at it; when every channel
+    # is busy they steal the oldest voice of the lowest priority not above
+    # their own, or are dropped. Starts are also capped per category and
+    # tick, so a burst of hits costs the same as a few.
+
+    def __init__(self):
+        self.ready = None  # None until the mixer has been tried
+        self.channels = []
+        self.voices = []  # (category, priority, serial) per channel
+        self.serial = 0
+        self.starts = dict.fromkeys(CATEGORIES, 0)
+        self.played = dict.fromkeys(CATEGORIES, 0)
+        self.dropped = dict.fromkeys(CATEGORIES, 0)
+        self.stolen = dict.fromkeys(CATEGORIES, 0)
+        # Set while ticks are played again, e.g. by a netplay rollback, so
+        # their sounds are not heard twice
+        self.muted = False
+
+    def setup(self):
+        if self.ready is None:
+            self.ready = ASSETS.init_audio()
+            if self.ready:
+                pygame.mixer.set_num_channels(CHANNELS)
+                pygame.mixer.set_reserved(1)
+                self.march_channel = pygame.mixer.Channel(0)
+                self.channels = [pygame.mixer.Channel(i) for i in range(1, CHANNELS)]
+                self.voices = [None] * len(self.channels)
+        return self.ready
+
+    def next_tick(self):
+        for category in self.starts:
+            self.starts[category] = 0
+
+    def play(self, name):
+        if self.muted or not self.setup():
+            return
+        sound = ASSETS.sound(name)
+        if sound is None:
+            return
+        category = SOUND_CATEGORIES[name]
+
+        if category == "march":
+            if self.march_channel.get_busy():
+                self.stolen[category] += 1
+            self.march_channel.play(sound)
+            self.played[category] += 1
+            return
+
+        limit, priority = CATEGORIES[category]
+        if self.starts[category] >= limit:
+            self.dropped[category] += 1
+            return
+
+        voices = self.voices
+        busy = [
+            index
+            for index, channel in enumerate(self.channels)
+            if channel.get_busy() and voices[index]
+        ]
+        own = [index for index in busy if voices[index][0] == category]
+        if len(own) >= limit:
+            index = min(own, key=lambda index: voices[index][2])
+            self.stolen[category] += 1
+        else:
+            index = next((i for i in range(len(self.channels)) if i not in busy), None)
+            if index is None:
+                victims = [i for i in busy if voices[i][1] <= priority]
+                if not victims:
+                    self.dropped[category] += 1
+                    return
+                index = min(victims, key=lambda i: (voices[i][1], voices[i][2]))
+                self.stolen[voices[index][0]] += 1
+
+        self.serial += 1
+        self.starts[category] += 1
+        self.channels[index].play(sound)
+        voices[index] = (category, priority, self.serial)
+        self.played[category] += 1
+
+    def summary(self):
+        return (
+            f"audio: played {sum(self.played.values())} "
+            f"dropped {sum(self.dropped.values())} "
+            f"stolen {sum(self.stolen.values())}"
+        )
+
+
+AUDIO = ChannelPool()
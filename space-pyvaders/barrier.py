@@ -1,3 +1,4 @@
+import numpy as np
 import pygame
 from constants import *
 
@@ -11,6 +12,23 @@ BARRIER_DESIGN = [
     "█████            █████",
     "█████            █████",
 ]
+BARRIER_CELLS = np.array(
+    [[pixel == "█" for pixel in row] for row in BARRIER_DESIGN], dtype=bool
+)
+
+
+def barrier_positions():
+    barrier_y = HEIGHT - 150  # Adjust this value to position barriers higher
+    barrier_width = BARRIER_SIZE[0]
+    gap_between_barriers = 100  # Increased from 50 to 100 (or any desired value)
+    total_width = (
+        NUM_BARRIERS * barrier_width + (NUM_BARRIERS - 1) * gap_between_barriers
+    )
+    start_x = (WIDTH - total_width) // 2
+    return [
+        (start_x + i * (barrier_width + gap_between_barriers), barrier_y)
+        for i in range(NUM_BARRIERS)
+    ]
 
 
 class Barrier:
@@ -19,45 +37,76 @@ class Barrier:
         self.color = BARRIER_COLOR
         self.pixels = self.create_pixel_array()
         self.pixel_size = BARRIER_SIZE[0] // len(BARRIER_DESIGN[0])
+        self.live_cells = int(self.pixels.sum())
+        self.image = self.create_image()
+        self.version = 0  # Bumped whenever the image changes
 
     def create_pixel_array(self):
-        return [[1 if pixel == "█" else 0 for pixel in row] for row in BARRIER_DESIGN]
+        return BARRIER_CELLS.copy()
 
-    def draw(self, screen):
+    def create_image(self):
+        image = pygame.Surface(self.rect.size, pygame.SRCALPHA)
         for y, row in enumerate(self.pixels):
             for x, pixel in enumerate(row):
                 if pixel:
                     pygame.draw.rect(
-                        screen,
+                        image,
                         self.color,
                         (
-                            self.rect.x + x * self.pixel_size,
-                            self.rect.y + y * self.pixel_size,
+                            x * self.pixel_size,
+                            y * self.pixel_size,
                             self.pixel_size,
                             self.pixel_size,
                         ),
                     )
+        return image
+
+    def draw(self, screen):
+        screen.blit(self.image, self.rect)
 
     def check_collision(self, rect):
-        collision_occurred = False
+        # Cheap reject before touching the array; touching the left or top
+        # edge still counts, matching the cell span computed below
+        if (
+            not self.live_cells
+            or rect.right < self.rect.left
+            or rect.left >= self.rect.right
+            or rect.bottom < self.rect.top
+            or rect.top >= self.rect.bottom
+        ):
+            return False
         collision_left = max(rect.left - self.rect.left, 0)
         collision_top = max(rect.top - self.rect.top, 0)
         collision_right = min(rect.right - self.rect.left, self.rect.width)
         collision_bottom = min(rect.bottom - self.rect.top, self.rect.height)
 
-        for y in range(
-            collision_top // self.pixel_size, collision_bottom // self.pixel_size + 1
-        ):
-            for x in range(
-                collision_left // self.pixel_size,
-                collision_right // self.pixel_size + 1,
-            ):
-                if 0 <= y < len(self.pixels) and 0 <= x < len(self.pixels[0]):
-                    if self.pixels[y][x]:
-                        self.pixels[y][x] = 0
-                        collision_occurred = True
+        # Cell span touched by the rect; touching an edge counts as a hit.
+        # Clamped at zero so a rect fully outside never wraps the slice.
+        top = collision_top // self.pixel_size
+        bottom = max(collision_bottom // self.pixel_size + 1, 0)
+        left = collision_left // self.pixel_size
+        right = max(collision_right // self.pixel_size + 1, 0)
+
+        region = self.pixels[top:bottom, left:right]
+        hit_cells = int(np.count_nonzero(region))
+        if not hit_cells:
+            return False
+        region[...] = False
+        self.live_cells -= hit_cells
+        self.version += 1
 
-        return collision_occurred
+        # Every cell in the span is now empty, so a single fill punches the
+        # whole hole into the pre-rendered image
+        self.image.fill(
+            (0, 0, 0, 0),
+            (
+                left * self.pixel_size,
+                top * self.pixel_size,
+                (right - left) * self.pixel_size,
+                (bottom - top) * self.pixel_size,
+            ),
+        )
+        return True
 
     def is_destroyed(self):
-        return all(not any(row) for row in self.pixels)
+        return self.live_cells == 0
@@ -0,0 +1,566 @@
+import argparse
+import time
+
+import sdl_dummy
+
+import numpy as np
+from constants import (
+    WIDTH,
+    HEIGHT,
+    PLAYER_SPEED,
+    INITIAL_LIVES,
+    ENEMY_DROP,
+    ENEMY_ROWS,
+    ENEMY_COLS,
+    ENEMY_SPACING_X,
+    ENEMY_SPACING_Y,
+    ENEMY_START_Y,
+    BARRIER_SIZE,
+    BULLET_SIZE,
+    PLAYER_BULLET_SPEED,
+    ENEMY_BULLET_SPEED,
+    LEVEL_COMPLETE_DELAY,
+    MAX_PLAYER_BULLETS,
+    MAX_ENEMY_BULLETS,
+)
+from controls import ACTIONS
+from difficulty import Difficulty
+from barrier import BARRIER_CELLS, barrier_positions
+from enemy import Enemy
+from player import Player
+from sim_clock import SimClock
+
+# Enemy.max_death_frames, Player.max_death_frames and
+# Game.death_animation_delay, which are not in constants.py
+ENEMY_DEATH_FRAMES = 8
+PLAYER_DEATH_FRAMES = 8
+PLAYER_DEATH_DELAY = 1000
+
+ENEMY_TYPES = ["small", "medium", "large"]
+ENEMY_SIZES = np.array(
+    [
+        (len(Enemy.ENEMY_DESIGNS[t][0][0]) * 5, len(Enemy.ENEMY_DESIGNS[t][0]) * 5)
+        for t in ENEMY_TYPES
+    ]
+)
+
+PLAYER_W, PLAYER_H = Player.PLAYER_SIZE
+PLAYER_TOP = HEIGHT - 10 - PLAYER_H
+PLAYER_START_X = WIDTH // 2 - PLAYER_W // 2
+BULLET_W, BULLET_H = BULLET_SIZE
+
+BARRIER_POSITIONS = barrier_positions()
+BARRIER_PIXEL = BARRIER_SIZE[0] // BARRIER_CELLS.shape[1]
+
+ACTION_LEFT, ACTION_RIGHT, ACTION_FIRE = (
+    np.array(column, dtype=bool) for column in zip(*ACTIONS)
+)
+
+
+class BatchGame:
+    # Steps many independent games in lockstep. Each piece of state is one
+    # array with the game index as its first axis, and every rule from
+    # EnemyFleet and Game.update is applied to all games at once.
+
+    def __init__(
+        self,
+        num_games,
+        seed=None,
+        player_bullets=MAX_PLAYER_BULLETS,
+        enemy_bullets=MAX_ENEMY_BULLETS,
+        auto_reset=True,
+        difficulty=None,
+    ):
+        n = num_games
+        rows, cols = ENEMY_ROWS, ENEMY_COLS
+        self.num_games = n
+        self.rng = np.random.default_rng(seed)
+        self.clock = SimClock()
+        self.auto_reset = auto_reset
+        self.difficulty = difficulty or Difficulty()
+
+        # Fleet
+        self.enemy_x = np.zeros((n, rows, cols), np.int32)
+        self.enemy_y = np.zeros((n, rows, cols), np.int32)
+        self.row_type = np.zeros((n, rows), np.int8)
+        self.enemy_alive = np.zeros((n, rows, cols), bool)
+        self.enemy_dying = np.zeros((n, rows, cols), bool)
+        self.enemy_death_frame = np.zeros((n, rows, cols), np.int8)
+        self.fleet_direction = np.ones(n, np.int32)
+        self.fleet_speed = np.zeros(n)
+        self.move_delay = np.zeros(n, np.int64)
+        self.move_time = np.zeros(n, np.int64)
+        self.last_enemy_shot = np.zeros(n, np.int64)
+        self.moving_row = np.zeros(n, np.int32)
+
+        # Player
+        self.player_x = np.zeros(n, np.int32)
+        self.lives = np.zeros(n, np.int32)
+        self.last_player_shot = np.zeros(n, np.int64)
+        self.player_dying = np.zeros(n, bool)
+        self.player_death_frame = np.zeros(n, np.int32)
+        self.death_pending = np.zeros(n, bool)
+        self.death_end_time = np.zeros(n, np.int64)
+
+        # Bullets live in fixed slots per game
+        self.player_bullet_x = np.zeros((n, player_bullets), np.int32)
+        self.player_bullet_y = np.zeros((n, player_bullets), np.int32)
+        self.player_bullet_active = np.zeros((n, player_bullets), bool)
+        self.enemy_bullet_x = np.zeros((n, enemy_bullets), np.int32)
+        self.enemy_bullet_y = np.zeros((n, enemy_bullets), np.int32)
+        self.enemy_bullet_active = np.zeros((n, enemy_bullets), bool)
+
+        self.barrier_cells = np.zeros(
+            (n, len(BARRIER_POSITIONS)) + BARRIER_CELLS.shape, bool
+        )
+
+        self.score = np.zeros(n, np.int64)
+        self.level = np.zeros(n, np.int32)
+        self.game_over = np.zeros(n, bool)
+        self.level_complete = np.zeros(n, bool)
+        self.level_complete_time = np.zeros(n, np.int64)
+
+        self.reset()
+
+    def reset(self, mask=None):
+        if mask is None:
+            mask = np.ones(self.num_games, bool)
+        self.level[mask] = 1
+        self.score[mask] = 0
+        self.lives[mask] = INITIAL_LIVES
+        # As in Player, the first shot is ready straight away
+        self.last_player_shot[mask] = -self.difficulty.player_shoot_cooldown - 1
+        self.game_over[mask] = False
+        self.level_complete[mask] = False
+        self.death_pending[mask] = False
+        self.barrier_cells[mask] = BARRIER_CELLS
+        self._reset_player(mask)
+        self._create_fleet(mask)
+        self._clear_bullets(mask)
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        left = ACTION_LEFT[actions]
+        right = ACTION_RIGHT[actions]
+        fire = ACTION_FIRE[actions]
+
+        self.clock.tick()
+        now = self.clock.get_ticks()
+        score_before = self.score.copy()
+        was_over = self.game_over.copy()
+
+        self._fire(fire, now)
+
+        # Game.update picks exactly one branch per game
+        running = ~self.game_over
+        completing = running & self.level_complete
+        dying = running & ~completing & self.player_dying
+        waiting = running & ~completing & ~dying & self.death_pending
+        playing = running & ~completing & ~dying & ~waiting
+
+        self._clear_bullets(completing)
+        self._advance_player_death(dying, now)
+        self._handle_player_death(
+            waiting & (now - self.death_end_time > PLAYER_DEATH_DELAY)
+        )
+        self._play(playing, left, right, now)
+        self._advance_level(now)
+
+        rewards = self.score - score_before
+        dones = self.game_over & ~was_over
+        if self.auto_reset and dones.any():
+            self.reset(dones)
+        return rewards, dones
+
+    def _play(self, mask, left, right, now):
+        # Player.update; the player row sits below the barriers, so the
+        # barrier push-back there never applies
+        move_left = mask & left & (self.player_x > 0)
+        self.player_x[move_left] -= PLAYER_SPEED
+        move_right = mask & right & (self.player_x + PLAYER_W < WIDTH)
+        self.player_x[move_right] += PLAYER_SPEED
+
+        # EnemyFleet.update
+        fleet_moved = self._move_fleet(mask, now)
+        self._enemy_shoot(mask, now)
+        self._advance_enemy_deaths(mask)
+
+        # Bullet movement and CollisionStage, in the same order
+        self._update_player_bullets(mask)
+        self._update_enemy_bullets(mask)
+        self._erode_by_enemies(fleet_moved)
+
+        widths, heights = self._enemy_sizes()
+        alive = self.enemy_alive
+        reached_bottom = alive & (self.enemy_y + heights >= HEIGHT - 50)
+        hit_player = alive & self._overlaps(
+            self.enemy_x,
+            self.enemy_y,
+            widths,
+            heights,
+            self.player_x[:, None, None],
+            PLAYER_TOP,
+            PLAYER_W,
+            PLAYER_H,
+        )
+        over = mask & (reached_bottom | hit_player).any(axis=(1, 2))
+        self._hit_player(over)
+
+        complete = mask & ~over & ~alive.any(axis=(1, 2))
+        self.level_complete[complete] = True
+        self.level_complete_time[complete] = now
+        self._clear_bullets(complete)
+
+    def _fire(self, fire, now):
+        can_fire = (
+            fire
+            & ~self.game_over
+            & ~self.level_complete
+            & (now - self.last_player_shot > self.difficulty.player_shoot_cooldown)
+        )
+        games = np.nonzero(can_fire)[0]
+        self._spawn(
+            self.player_bullet_x,
+            self.player_bullet_y,
+            self.player_bullet_active,
+            games,
+            self.player_x[games] + PLAYER_W // 2 - BULLET_W // 2,
+            PLAYER_TOP,
+        )
+        self.last_player_shot[games] = now
+
+    def _move_fleet(self, mask, now):
+        moved = np.zeros(self.num_games, bool)
+        due = mask & (now - self.move_time > self.move_delay)
+        self.move_time[due] = now
+        games = np.nonzero(due)[0]
+        if not games.size:
+            return moved
+
+        rows = self.moving_row[games]
+        self.moving_row[games] = (rows + 1) % ENEMY_ROWS
+
+        alive = self.enemy_alive[games, rows]
+        xs = self.enemy_x[games, rows]
+        widths = ENEMY_SIZES[self.row_type[games, rows], 0]
+        occupied = alive.any(axis=1)
+        right = np.where(alive, xs + widths[:, None], np.iinfo(np.int32).min).max(1)
+        left = np.where(alive, xs, np.iinfo(np.int32).max).min(1)
+
+        direction = self.fleet_direction[games]
+        turn = occupied & (
+            ((right >= WIDTH - 10) & (direction > 0)) | ((left <= 10) & (direction < 0))
+        )
+        direction = np.where(turn, -direction, direction)
+        self.fleet_direction[games] = direction
+
+        # Rect.move_ip truncates fractional speeds toward zero
+        dx = np.trunc(self.fleet_speed[games] * direction).astype(np.int32)
+        movers = alive & ~self.enemy_dying[games, rows]
+        self.enemy_x[games, rows] += np.where(movers, dx[:, None], 0)
+
+        dropping = games[turn]
+        movers = self.enemy_alive[dropping] & ~self.enemy_dying[dropping]
+        self.enemy_y[dropping] += np.where(movers, ENEMY_DROP, 0)
+
+        moved[games[occupied]] = True
+        return moved
+
+    def _enemy_shoot(self, mask, now):
+        # Only the lowest enemy in each column can fire, as in FleetGrid
+        shooters = self.enemy_alive & ~self.enemy_dying
+        front = shooters.any(axis=1)
+        due = (
+            mask
+            & (now - self.last_enemy_shot > self.difficulty.shoot_delay)
+            & front.any(axis=1)
+        )
+        games = np.nonzero(due)[0]
+        if not games.size:
+            return
+
+        # Uniform pick among each game's front line, like random.choice
+        keys = self.rng.random((games.size, ENEMY_COLS))
+        keys[~front[games]] = -1.0
+        cols = keys.argmax(axis=1)
+        lowest = shooters[games, ::-1, cols].argmax(axis=1)
+        rows = ENEMY_ROWS - 1 - lowest
+        width, height = ENEMY_SIZES[self.row_type[games, rows]].T
+        self._spawn(
+            self.enemy_bullet_x,
+            self.enemy_bullet_y,
+            self.enemy_bullet_active,
+            games,
+            self.enemy_x[games, rows, cols] + width // 2 - BULLET_W // 2,
+            self.enemy_y[games, rows, cols] + height,
+        )
+        self.last_enemy_shot[games] = now
+
+    def _update_enemy_bullets(self, mask):
+        # One slot at a time so bullets in the same game resolve in order
+        for slot in range(self.enemy_bullet_active.shape[1]):
+            active = mask & self.enemy_bullet_active[:, slot]
+            if not active.any():
+                continue
+            self.enemy_bullet_y[active, slot] += ENEMY_BULLET_SPEED
+            gone = active & (self.enemy_bullet_y[:, slot] > HEIGHT)
+            self.enemy_bullet_active[gone, slot] = False
+
+            games = np.nonzero(active & ~gone)[0]
+            xs = self.enemy_bullet_x[games, slot]
+            ys = self.enemy_bullet_y[games, slot]
+            blocked = self._erode(games, xs, ys, BULLET_W, BULLET_H)
+            self.enemy_bullet_active[games[blocked], slot] = False
+
+            games, xs, ys = games[~blocked], xs[~blocked], ys[~blocked]
+            hit = self._overlaps(
+                xs,
+                ys,
+                BULLET_W,
+                BULLET_H,
+                self.player_x[games],
+                PLAYER_TOP,
+                PLAYER_W,
+                PLAYER_H,
+            )
+            self.enemy_bullet_active[games[hit], slot] = False
+            hit_mask = np.zeros(self.num_games, bool)
+            hit_mask[games[hit]] = True
+            self._hit_player(hit_mask)
+
+    def _update_player_bullets(self, mask):
+        for slot in range(self.player_bullet_active.shape[1]):
+            active = mask & self.player_bullet_active[:, slot]
+            if not active.any():
+                continue
+            self.player_bullet_y[active, slot] -= PLAYER_BULLET_SPEED
+            gone = active & (self.player_bullet_y[:, slot] + BULLET_H < 0)
+            self.player_bullet_active[gone, slot] = False
+
+            games = np.nonzero(active & ~gone)[0]
+            xs = self.player_bullet_x[games, slot]
+            ys = self.player_bullet_y[games, slot]
+            blocked = self._erode(games, xs, ys, BULLET_W, BULLET_H)
+            self.player_bullet_active[games[blocked], slot] = False
+
+            games, xs, ys = games[~blocked], xs[~blocked], ys[~blocked]
+            widths, heights = self._enemy_sizes(games)
+            targets = (
+                self.enemy_alive[games]
+                & ~self.enemy_dying[games]
+                & self._overlaps(
+                    self.enemy_x[games],
+                    self.enemy_y[games],
+                    widths,
+                    heights,
+                    xs[:, None, None],
+                    ys[:, None, None],
+                    BULLET_W,
+                    BULLET_H,
+                )
+            ).reshape(games.size, ENEMY_ROWS * ENEMY_COLS)
+            hit = targets.any(axis=1)
+            games = games[hit]
+            # First match in row-major order, as EnemyFleet.check_collision
+            rows, cols = np.divmod(targets[hit].argmax(axis=1), ENEMY_COLS)
+            self.enemy_dying[games, rows, cols] = True
+            self.enemy_death_frame[games, rows, cols] = 0
+            self.player_bullet_active[games, slot] = False
+            self.score[games] += 10
+
+    def _advance_enemy_deaths(self, mask):
+        dying = mask[:, None, None] & self.enemy_dying
+        self.enemy_death_frame[dying] += 1
+        dead = dying & (self.enemy_death_frame >= ENEMY_DEATH_FRAMES)
+        self.enemy_alive[dead] = False
+        self.enemy_dying[dead] = False
+        self.enemy_death_frame[dead] = 0
+
+    def _erode_by_enemies(self, mask):
+        games = np.nonzero(mask)[0]
+        if not games.size:
+            return
+        # Broadphase: only enemies level with the barrier cells can touch them
+        widths, heights = self._enemy_sizes(games)
+        top = BARRIER_POSITIONS[0][1]
+        bottom = top + BARRIER_CELLS.shape[0] * BARRIER_PIXEL
+        ys = self.enemy_y[games]
+        near = self.enemy_alive[games] & (ys + heights >= top) & (ys < bottom)
+        index, rows, cols = np.nonzero(near)
+        if not index.size:
+            return
+        width, height = ENEMY_SIZES[self.row_type[games[index], rows]].T
+        self._erode(
+            games[index],
+            self.enemy_x[games[index], rows, cols],
+            ys[index, rows, cols],
+            width,
+            height,
+        )
+
+    def _erode(self, games, xs, ys, width, height):
+        # Vectorised Barrier.check_collision: clears every barrier cell the
+        # box touches and reports which boxes hit something. Each box is
+        # expanded into a fixed stencil of candidate cells, masked to the
+        # cells that Barrier.check_collision would visit.
+        hit = np.zeros(games.size, bool)
+        if not games.size:
+            return hit
+        cell_rows, cell_cols = BARRIER_CELLS.shape
+        ps = BARRIER_PIXEL
+        stencil_rows = np.arange(int(np.max(height)) // ps + 2)[None, :, None]
+        stencil_cols = np.arange(int(np.max(width)) // ps + 2)[None, None, :]
+
+        for barrier, (bx, by) in enumerate(BARRIER_POSITIONS):
+            first_row = np.maximum(ys - by, 0) // ps
+            last_row = np.minimum(ys + height - by, BARRIER_SIZE[1]) // ps
+            first_col = np.maximum(xs - bx, 0) // ps
+            last_col = np.minimum(xs + width - bx, BARRIER_SIZE[0]) // ps
+
+            rows = first_row[:, None, None] + stencil_rows
+            cols = first_col[:, None, None] + stencil_cols
+            if np.ndim(last_row):
+                last_row = last_row[:, None, None]
+            if np.ndim(last_col):
+                last_col = last_col[:, None, None]
+            inside = (
+                (rows <= last_row)
+                & (cols <= last_col)
+                & (rows < cell_rows)
+                & (cols < cell_cols)
+            )
+            box, r, c = np.nonzero(inside)
+            if not box.size:
+                continue
+            cells = (games[box], barrier, rows[box, r, 0], cols[box, 0, c])
+            hit[box[self.barrier_cells[cells]]] = True
+            self.barrier_cells[cells] = False
+        return hit
+
+    def _hit_player(self, mask):
+        # Game.trigger_game_over -> Player.hit
+        hit = mask & ~self.game_over & ~self.player_dying
+        self.player_dying[hit] = True
+        self.player_death_frame[hit] = 0
+
+    def _advance_player_death(self, mask, now):
+        self.player_death_frame[mask] += 1
+        done = mask & (self.player_death_frame >= PLAYER_DEATH_FRAMES)
+        self.player_dying[done] = False
+        self.player_death_frame[done] = 0
+        self.death_pending[done] = True
+        self.death_end_time[done] = now
+
+    def _handle_player_death(self, mask):
+        self.lives[mask] -= 1
+        self.death_pending[mask] = False
+        self._clear_bullets(mask)
+        survived = mask & (self.lives > 0)
+        self._reset_player(survived)
+        self._create_fleet(survived)
+        out = mask & ~survived
+        self.game_over[out] = True
+        self.enemy_alive[out] = False
+
+    def _advance_level(self, now):
+        due = (
+            ~self.game_over
+            & self.level_complete
+            & (now - self.level_complete_time > LEVEL_COMPLETE_DELAY)
+        )
+        self.level[due] += 1
+        self._create_fleet(due)
+        self.player_x[due] = PLAYER_START_X
+        self.level_complete[due] = False
+        self._clear_bullets(due)
+
+    def _reset_player(self, mask):
+        self.player_x[mask] = PLAYER_START_X
+        self.player_dying[mask] = False
+        self.player_death_frame[mask] = 0
+
+    def _create_fleet(self, mask):
+        games = np.nonzero(mask)[0]
+        if not games.size:
+            return
+        cols = np.arange(ENEMY_COLS)
+        rows = np.arange(ENEMY_ROWS)
+        self.row_type[games] = self.rng.integers(
+            len(ENEMY_TYPES), size=(games.size, ENEMY_ROWS)
+        )
+        self.enemy_x[games] = (
+            cols * ENEMY_SPACING_X + (WIDTH - ENEMY_COLS * ENEMY_SPACING_X) // 2
+        )
+        self.enemy_y[games] = (rows * ENEMY_SPACING_Y + ENEMY_START_Y)[:, None]
+        self.enemy_alive[games] = True
+        self.enemy_dying[games] = False
+        self.enemy_death_frame[games] = 0
+
+        level = self.level[games]
+        self.fleet_direction[games] = 1
+        self.move_time[games] = 0
+        # Difficulty.fleet_move_delay and fleet_speed, for arrays of levels
+        difficulty = self.difficulty
+        self.move_delay[games] = np.maximum(
+            difficulty.min_move_delay,
+            difficulty.move_delay - (level - 1) * difficulty.move_delay_decrease,
+        )
+        self.fleet_speed[games] = (
+            difficulty.enemy_speed + (level - 1) * difficulty.enemy_speed_increase
+        )
+        self.last_enemy_shot[games] = self.clock.get_ticks()
+        self.moving_row[games] = 0
+        # A new EnemyFleet starts with an empty bullet list
+        self.enemy_bullet_active[games] = False
+
+    def _clear_bullets(self, mask):
+        self.player_bullet_active[mask] = False
+        self.enemy_bullet_active[mask] = False
+
+    def _enemy_sizes(self, games=slice(None)):
+        sizes = ENEMY_SIZES[self.row_type[games]]
+        return sizes[..., 0, None], sizes[..., 1, None]
+
+    @staticmethod
+    def _spawn(xs, ys, active, games, x, y):
+        # First free slot per game; games with no free slot drop the bullet
+        slots = active[games].argmin(axis=1)
+        free = ~active[games, slots]
+        games, slots = games[free], slots[free]
+        xs[games, slots] = x[free]
+        ys[games, slots] = y[free] if np.ndim(y) else y
+        active[games, slots] = True
+
+    @staticmethod
+    def _overlaps(ax, ay, aw, ah, bx, by, bw, bh):
+        # pygame.Rect.colliderect for arrays of rects
+        return (ax < bx + bw) & (ax + aw > bx) & (ay < by + bh) & (ay + ah > by)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Step many Space Invaders games at once with NumPy"
+    )
+    parser.add_argument("--games", type=int, default=256)
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    batch = BatchGame(args.games, seed=args.seed)
+    rng = np.random.default_rng(args.seed)
+    finished = 0
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        _, dones = batch.step(rng.integers(len(ACTIONS), size=args.games))
+        finished += int(dones.sum())
+    elapsed = time.perf_counter() - start
+
+    total = args.games * args.steps
+    print(
+        f"{total} game frames in {elapsed:.2f}s "
+        f"({total / elapsed:.0f} game frames/sec), {finished} game(s) finished"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import argparse
+import itertools
+import json
+import random
+import statistics
+import time
+from multiprocessing import Pool
+
+import sdl_dummy
+
+from constants import FPS, INITIAL_LIVES
+from difficulty import Difficulty
+from headless import POLICIES
+
+DEFAULT_MAX_FRAMES = FPS * 60 * 10  # Ten minutes of play
+
+
+def play_game(job):
+    # Runs in a worker: one window-less game from reset to game over (or the
+    # frame limit) with the job's policy, seed and difficulty parameters
+    from game import Game
+
+    policy, seed, params, max_frames = job
+    game = Game(headless=True, seed=seed, difficulty=Difficulty(**params))
+    game.reset_game()
+    act = POLICIES[policy](random.Random(seed))
+    frames = 0
+    while not game.game_over and frames < max_frames:
+        game.step(act(game))
+        frames += 1
+    return {
+        "policy": policy,
+        "seed": seed,
+        "params": params,
+        "score": game.score,
+        "level": game.level,
+        "frames": frames,
+        "lives_lost": INITIAL_LIVES - game.player.lives,
+        "game_over": game.game_over,
+    }
+
+
+def make_jobs(policy, games, seed, sweep, max_frames):
+    # One job per game for every combination of the swept values; each
+    # combination plays the same seeds so they are compared like for like
+    names = sorted(sweep)
+    for values in itertools.product(*(sweep[name] for name in names)):
+        params = dict(zip(names, values))
+        for index in range(games):
+            yield policy, seed + index, params, max_frames
+
+
+def run_batch(jobs, processes=None, on_result=None):
+    # Plays every job across a process pool, one per core by default, and
+    # returns the results in completion order
+    results = []
+    with Pool(processes) as pool:
+        for result in pool.imap_unordered(play_game, jobs, chunksize=4):
+            results.append(result)
+            if on_result:
+                on_result(result)
+        # Let the workers exit on their own: leaving the block terminates them
+        # with SIGTERM, which SDL catches once pygame is up in a worker
+        pool.close()
+        pool.join()
+    return results
+
+
+def summarize(results):
+    # Per parameter set: games played and mean/median/spread of the outcomes
+    groups = {}
+    for result in results:
+        key = json.dumps(result["params"], sort_keys=True)
+        groups.setdefault(key, []).append(result)
+
+    summary = []
+    for key, group in sorted(groups.items()):
+        scores = [result["score"] for result in group]
+        summary.append(
+            {
+                "params": json.loads(key),
+                "games": len(group),
+                "score_mean": statistics.mean(scores),
+                "score_median": statistics.median(scores),
+                "score_stdev": statistics.stdev(scores) if len(scores) > 1 else 0.0,
+                "level_mean": statistics.mean(result["level"] for result in group),
+                "level_max": max(result["level"] for result in group),
+                "frames_mean": statistics.mean(result["frames"] for result in group),
+                "lives_lost_mean": statistics.mean(
+                    result["lives_lost"] for result in group
+                ),
+                "finished": sum(result["game_over"] for result in group),
+            }
+        )
+    return summary
+
+
+def parse_param(text):
+    # "name=v1,v2,..." naming a Difficulty attribute
+    name, _, values = text.partition("=")
+    if name not in Difficulty().as_dict() or not values:
+        raise argparse.ArgumentTypeError(
+            f"expected NAME=V1,V2,... with NAME one of "
+            f"{', '.join(Difficulty().as_dict())}"
+        )
+    try:
+        return name, [json.loads(value) for value in values.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"bad value in {text!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play many window-less games on every core and summarize them"
+    )
+    parser.add_argument(
+        "--games", type=int, default=100, help="games per parameter set"
+    )
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument(
+        "--param",
+        type=parse_param,
+        action="append",
+        default=[],
+        metavar="NAME=V1,V2,...",
+        help="sweep a difficulty parameter over the given values; "
+        "repeat to sweep the combinations of several",
+    )
+    parser.add_argument("--max-frames", type=int, default=DEFAULT_MAX_FRAMES)
+    parser.add_argument("--processes", type=int, help="default: one per core")
+    parser.add_argument(
+        "--out", metavar="PATH", help="stream every game's result to PATH as JSONL"
+    )
+    parser.add_argument(
+        "--summary", metavar="PATH", help="write the summary to PATH as JSON"
+    )
+    args = parser.parse_args()
+
+    jobs = list(
+        make_jobs(args.policy, args.games, args.seed, dict(args.param), args.max_frames)
+    )
+    out = open(args.out, "w") if args.out else None
+    done = 0
+
+    def on_result(result):
+        nonlocal done
+        done += 1
+        if out:
+            out.write(json.dumps(result) + "\n")
+        if done % 100 == 0 or done == len(jobs):
+            print(f"{done}/{len(jobs)} games", end="\r", flush=True)
+
+    start = time.perf_counter()
+    try:
+        results = run_batch(jobs, args.processes, on_result)
+    finally:
+        if done:
+            print()  # End the progress line
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - start
+    frames = sum(result["frames"] for result in results)
+    print(
+        f"{len(results)} games, {frames} frames in {elapsed:.1f}s "
+        f"({frames / elapsed:.0f} frames/sec)"
+    )
+
+    summary = summarize(results)
+    for entry in summary:
+        params = " ".join(f"{name}={value}" for name, value in entry["params"].items())
+        print(
+            f"{params or 'defaults'}: {entry['games']} games, score "
+            f"{entry['score_mean']:.0f} mean / {entry['score_median']:.0f} median "
+            f"(sd {entry['score_stdev']:.0f}), level {entry['level_mean']:.2f} mean / "
+            f"{entry['level_max']} max, {entry['lives_lost_mean']:.2f} lives lost, "
+            f"{entry['frames_mean'] / FPS:.0f}s per game"
+        )
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
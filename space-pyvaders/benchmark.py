@@ -0,0 +1,250 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+import sdl_dummy
+
+import numpy as np
+import pygame
+from constants import BULLET_SIZE, WIDTH, HEIGHT
+from barrier import Barrier, barrier_positions
+from enemy import EnemyFleet
+from game import Game
+from headless import random_policy
+from rng_streams import RngStreams
+from sim_clock import SimClock
+
+# Every benchmark is a setup function taking an RNG and returning
+# (run, ops): run() does the timed work, which is `ops` operations, and a
+# fresh setup is made for every sample so state never carries over. All
+# randomness is seeded from the sample number.
+
+
+def bullet_rects(rng, count, area):
+    return [
+        pygame.Rect(
+            rng.randrange(area.left - BULLET_SIZE[0], area.right),
+            rng.randrange(area.top - BULLET_SIZE[1], area.bottom),
+            *BULLET_SIZE,
+        )
+        for _ in range(count)
+    ]
+
+
+def barrier_collision(rng):
+    # Heavy fire across the barrier line; most shots chew into barriers
+    barriers = [Barrier(x, y) for x, y in barrier_positions()]
+    area = barriers[0].rect.unionall([barrier.rect for barrier in barriers[1:]])
+    rects = bullet_rects(rng, 2000, area)
+
+    def run():
+        for rect in rects:
+            for barrier in barriers:
+                if barrier.check_collision(rect):
+                    break
+
+    return run, len(rects)
+
+
+def fleet_update(rng):
+    # Ten seconds of a full 5x11 fleet marching, animating and shooting
+    clock = SimClock()
+    fleet = EnemyFleet(1, clock, RngStreams(rng.getrandbits(32)))
+
+    def run():
+        for _ in range(600):
+            clock.tick()
+            fleet.update()
+
+    return run, 600
+
+
+def fleet_check_collision(rng):
+    clock = SimClock()
+    fleet = EnemyFleet(1, clock, RngStreams(rng.getrandbits(32)))
+    rects = bullet_rects(rng, 2000, fleet.bounds.inflate(40, 40))
+
+    def run():
+        for rect in rects:
+            fleet.check_collision(rect)
+
+    return run, len(rects)
+
+
+def enemy_animate(rng):
+    clock = SimClock()
+    fleet = EnemyFleet(1, clock, RngStreams(rng.getrandbits(32)))
+    enemies = fleet.enemies
+
+    def run():
+        for _ in range(100):
+            for enemy in enemies:
+                enemy.animate()
+
+    return run, 100 * len(enemies)
+
+
+def game_draw(rng):
+    # Full fleet, barriers and a screenful of bullets, drawn and flipped
+    game = Game(seed=rng.getrandbits(32))
+    game.reset_game()
+    for _ in range(8):
+        game.bullets.spawn(rng.randrange(WIDTH), rng.randrange(HEIGHT), -1)
+    for _ in range(32):
+        game.enemy_fleet.bullets.spawn(rng.randrange(WIDTH), rng.randrange(HEIGHT), 1)
+
+    def run():
+        for _ in range(200):
+            game.draw()
+
+    return run, 200
+
+
+def gameplay_frames(rng):
+    # Scripted play, stepped and drawn like the real loop, restarting on
+    # game over
+    game = Game(seed=rng.getrandbits(32))
+    game.reset_game()
+    act = random_policy(rng)
+
+    def run():
+        for _ in range(1000):
+            game.step(act(game))
+            game.draw()
+            if game.game_over:
+                game.reset_game()
+
+    return run, 1000
+
+
+BENCHMARKS = {
+    "barrier_collision": barrier_collision,
+    "fleet_update": fleet_update,
+    "fleet_check_collision": fleet_check_collision,
+    "enemy_animate": enemy_animate,
+    "game_draw": game_draw,
+    "gameplay_frames": gameplay_frames,
+}
+
+
+def measure(setup, seed, samples, warmup):
+    # Microseconds per operation for each sample after the warmup ones
+    times = []
+    for sample in range(warmup + samples):
+        rng = random.Random(seed * 1000 + sample)
+        run, ops = setup(rng)
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        if sample >= warmup:
+            times.append(elapsed * 1e6 / ops)
+    return {
+        "median_us": statistics.median(times),
+        "mean_us": statistics.mean(times),
+        "stdev_us": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "min_us": min(times),
+        "max_us": max(times),
+        "samples": len(times),
+    }
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "system": platform.system(),
+    }
+
+
+def compare(results, baseline, threshold):
+    # Names of benchmarks whose median got slower than the baseline's by
+    # more than `threshold`, as a fraction
+    regressions = []
+    for name, result in results.items():
+        old = baseline["results"].get(name)
+        if not old:
+            continue
+        change = result["median_us"] / old["median_us"] - 1
+        result["change"] = change
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time the game's hot paths with fixed seeds"
+    )
+    parser.add_argument(
+        "names", nargs="*", metavar="NAME", help="benchmarks to run (default: all)"
+    )
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", metavar="PATH", help="write results as a baseline")
+    parser.add_argument(
+        "--compare", metavar="PATH", help="compare against a saved baseline"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="slowdown of the median, as a fraction, that counts as a "
+        "regression (default: 0.10)",
+    )
+    args = parser.parse_args()
+
+    names = args.names or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    results = {}
+    for name in names:
+        results[name] = measure(BENCHMARKS[name], args.seed, args.samples, args.warmup)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+
+    print(f"{'benchmark':<24}{'median':>12}{'mean':>12}{'stdev':>12}{'min':>12}")
+    for name, result in results.items():
+        line = (
+            f"{name:<24}{result['median_us']:>10.2f}us{result['mean_us']:>10.2f}us"
+            f"{result['stdev_us']:>10.2f}us{result['min_us']:>10.2f}us"
+        )
+        if "change" in result:
+            line += f"  {result['change']:+.1%}"
+            if name in regressions:
+                line += "  REGRESSION"
+        print(line)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(
+                {
+                    "seed": args.seed,
+                    "samples": args.samples,
+                    "warmup": args.warmup,
+                    "environment": environment(),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+    pygame.quit()
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
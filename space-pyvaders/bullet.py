@@ -3,14 +3,75 @@ from constants import *
 
 
 class Bullet:
+    __slots__ = ("rect", "speed", "direction", "prev_y")
+
     def __init__(self, x, y, direction):
-        self.rect = pygame.Rect(x - BULLET_SIZE[0] // 2, y, *BULLET_SIZE)
+        self.rect = pygame.Rect(0, 0, *BULLET_SIZE)
+        self.reset(x, y, direction)
+
+    def reset(self, x, y, direction):
+        self.rect.topleft = (x - BULLET_SIZE[0] // 2, y)
+        self.prev_y = y  # Position at the start of the tick, for interpolation
         self.speed = PLAYER_BULLET_SPEED if direction == -1 else ENEMY_BULLET_SPEED
         self.direction = direction
 
     def update(self):
         self.rect.y += self.speed * self.direction
 
-    def draw(self, screen):
+    def draw(self, screen, alpha=1.0):
         color = GREEN if self.direction == -1 else WHITE
-        pygame.draw.rect(screen, color, self.rect)
+        if alpha == 1.0:
+            pygame.draw.rect(screen, color, self.rect)
+            return
+        y = round(self.prev_y + (self.rect.y - self.prev_y) * alpha)
+        pygame.draw.rect(screen, color, (self.rect.x, y, *self.rect.size))
+
+
+class BulletPool:
+    # Fixed set of preallocated bullets. The first `active` slots are live;
+    # retiring one swaps it with the last live slot, so removal is O(1) and
+    # nothing is allocated after construction.
+
+    def __init__(self, capacity):
+        self.slots = [Bullet(0, 0, 1) for _ in range(capacity)]
+        self.active = 0
+        self.dropped = 0  # Spawns refused because every slot was in use
+
+    def spawn(self, x, y, direction):
+        if self.active == len(self.slots):
+            self.dropped += 1
+            return None
+        bullet = self.slots[self.active]
+        bullet.reset(x, y, direction)
+        self.active += 1
+        return bullet
+
+    def retire(self, index):
+        # Safe while walking the live slots from the end towards the start
+        last = self.active - 1
+        self.slots[index], self.slots[last] = self.slots[last], self.slots[index]
+        self.active = last
+
+    def update(self):
+        # Advances every live bullet and retires the ones that left the screen
+        slots = self.slots
+        for index in range(self.active - 1, -1, -1):
+            bullet = slots[index]
+            bullet.rect.y += bullet.speed * bullet.direction
+            if bullet.rect.bottom < 0 or bullet.rect.top > HEIGHT:
+                self.retire(index)
+
+    def clear(self):
+        self.active = 0
+
+    def __len__(self):
+        return self.active
+
+    def __getitem__(self, index):
+        if index >= self.active:
+            raise IndexError("bullet index out of range")
+        return self.slots[index]
+
+    def __iter__(self):
+        for index in range(self.active):
+            yield self.slots[index]
@@ -0,0 +1,198 @@
+import os
+import queue
+import shutil
+import struct
+import subprocess
+import threading
+import zlib
+import numpy as np
+
+QUEUE_FRAMES = 8  # Frames that can wait for the writer before dropping
+PNG_LEVEL = 1  # zlib level; fast beats small at 60 frames a second
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".webm", ".mov", ".avi")
+
+
+def png_chunk(kind, data):
+    return (
+        struct.pack(">I", len(data))
+        + kind
+        + data
+        + struct.pack(">I", zlib.crc32(kind + data))
+    )
+
+
+def encode_png(rows):
+    # rows is a (height, 1 + width * 3) uint8 array of RGB scanlines, each
+    # led by its filter byte. zlib does the work and lets go of the GIL
+    # meanwhile, so the game thread keeps running.
+    height, row_bytes = rows.shape
+    header = struct.pack(">IIBBBBB", (row_bytes - 1) // 3, height, 8, 2, 0, 0, 0)
+    return b"".join(
+        (
+            b"\x89PNG\r\n\x1a\n",
+            png_chunk(b"IHDR", header),
+            png_chunk(b"IDAT", zlib.compress(rows.data, PNG_LEVEL)),
+            png_chunk(b"IEND", b""),
+        )
+    )
+
+
+class FrameCapture:
+    # Records the frames shown in the window. grab() copies the display
+    # surface through its buffer view into one of a fixed set of buffers and
+    # queues it; a writer thread saves queued frames and hands the buffers
+    # back. With no free buffer the frame is dropped and counted, so a slow
+    # disk or encoder never holds up the game. Where frames go follows from
+    # the path:
+    #   *.mp4 and other video files  piped to ffmpeg, when it is installed
+    #   a directory                  numbered PNGs
+    #   anything else                raw frames back to back, as described
+    #                                by the summary printed on close
+    # A video path falls back to raw frames next to it without ffmpeg.
+
+    def __init__(self, path, surface, rate, queue_frames=QUEUE_FRAMES):
+        self.size = surface.get_size()
+        self.pitch = surface.get_pitch()
+        self.rate = rate
+        self.pixel_format = self.describe(surface)
+        self.frame_bytes = self.pitch * self.size[1]
+        self.free = queue.Queue()
+        for _ in range(queue_frames):
+            self.free.put(bytearray(self.frame_bytes))
+        self.frames = queue.Queue()
+        self.captured = 0
+        self.dropped = 0  # Frames there was no free buffer for
+        self.written = 0
+        self.failed = 0  # Frames the writer could not save
+        self.encoder = None
+        self.file = None
+
+        self.mode, self.path = self.choose_output(path)
+        if self.mode == "video":
+            self.encoder = subprocess.Popen(
+                self.encoder_command(), stdin=subprocess.PIPE
+            )
+        elif self.mode == "png":
+            os.makedirs(self.path, exist_ok=True)
+            width, height = self.size
+            # Scanlines with filter byte 0, reused for every frame
+            self.rows = np.zeros((height, 1 + width * 3), dtype=np.uint8)
+        else:
+            self.file = open(self.path, "wb")
+        self.thread = threading.Thread(target=self.write_frames, daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def describe(surface):
+        # The byte order of the pixels, in ffmpeg's pix_fmt names
+        if surface.get_bytesize() != 4:
+            raise ValueError("frame capture needs a 32-bit display surface")
+        red, green, blue, _ = surface.get_masks()
+        if (red, green, blue) == (0xFF0000, 0x00FF00, 0x0000FF):
+            return "bgr0"
+        if (red, green, blue) == (0x0000FF, 0x00FF00, 0xFF0000):
+            return "rgb0"
+        raise ValueError("unsupported display pixel format")
+
+    @staticmethod
+    def choose_output(path):
+        if path.lower().endswith(VIDEO_EXTENSIONS):
+            if shutil.which("ffmpeg"):
+                return "video", path
+            raw = os.path.splitext(path)[0] + ".raw"
+            print(f"Warning: ffmpeg not found, capturing raw frames to {raw}")
+            return "raw", raw
+        if os.path.isdir(path) or path.endswith(os.sep):
+            return "png", path
+        return "raw", path
+
+    def encoder_command(self):
+        width, height = self.size
+        return [
+            "ffmpeg",
+            "-loglevel",
+            "error",
+            "-y",
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            self.pixel_format,
+            "-s",
+            f"{self.pitch // 4}x{height}",
+            "-r",
+            str(self.rate),
+            "-i",
+            "-",
+            "-vf",
+            f"crop={width}:{height}:0:0",
+            "-pix_fmt",
+            "yuv420p",
+            self.path,
+        ]
+
+    def grab(self, surface):
+        # Call right after the display is updated
+        try:
+            buffer = self.free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return
+        memoryview(buffer)[:] = surface.get_view("0")
+        self.frames.put((self.captured, buffer))
+        self.captured += 1
+
+    def write_frames(self):
+        while True:
+            item = self.frames.get()
+            if item is None:
+                return
+            index, buffer = item
+            try:
+                self.write(index, buffer)
+                self.written += 1
+            except OSError as error:
+                # Keep draining so grab() sees free buffers
+                if not self.failed:
+                    print(f"Warning: frame capture failed: {error}")
+                self.failed += 1
+            self.free.put(buffer)
+
+    def write(self, index, buffer):
+        if self.mode == "png":
+            width, height = self.size
+            pixels = np.frombuffer(buffer, dtype=np.uint8)
+            pixels = pixels.reshape(height, self.pitch // 4, 4)[:, :width]
+            rgb = self.rows[:, 1:].reshape(height, width, 3)
+            order = (2, 1, 0) if self.pixel_format == "bgr0" else (0, 1, 2)
+            for channel, source in enumerate(order):
+                rgb[..., channel] = pixels[..., source]
+            with open(os.path.join(self.path, f"{index:06d}.png"), "wb") as f:
+                f.write(encode_png(self.rows))
+        elif self.encoder:
+            self.encoder.stdin.write(buffer)
+        else:
+            self.file.write(buffer)
+
+    def close(self):
+        self.frames.put(None)
+        self.thread.join()
+        if self.encoder:
+            self.encoder.stdin.close()
+            self.encoder.wait()
+        if self.file:
+            self.file.close()
+        print(self.summary())
+
+    def summary(self):
+        text = (
+            f"capture: {self.written} frames written to {self.path}, "
+            f"{self.dropped} dropped"
+        )
+        if self.failed:
+            text += f", {self.failed} failed"
+        if self.mode == "raw":
+            text += (
+                f" (raw {self.pixel_format} {self.pitch // 4}x{self.size[1]} "
+                f"at {self.rate} fps)"
+            )
+        return text
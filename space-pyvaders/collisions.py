@@ -0,0 +1,100 @@
+from collections import namedtuple
+
+HitEvent = namedtuple("HitEvent", ["kind", "target"])
+
+ENEMY_KILLED = "enemy_killed"
+PLAYER_HIT = "player_hit"
+BARRIER_DESTROYED = "barrier_destroyed"
+
+
+class CollisionStage:
+    # Resolves every collision of a tick in one pass, after everything has
+    # moved: player bullets against barriers then enemies, enemy bullets
+    # against barriers then the players' ships, and the fleet against barriers when
+    # it stepped. Bullets are retired and barriers eroded here; scoring and
+    # sound are left to whoever consumes the returned events.
+    #
+    # The broadphase works on each bullet's swept box, the span it covered
+    # this tick, so nothing is skipped that a bullet could have reached.
+
+    def __init__(self):
+        self.events = []
+
+    def run(self, ships, fleet, player_bullets, barriers):
+        events = self.events
+        events.clear()
+        zone = self.barrier_zone(barriers)
+
+        # Player bullets travel up, so they swept the span below them
+        fleet_bounds = fleet.bounds
+        slots = player_bullets.slots
+        for index in range(player_bullets.active - 1, -1, -1):
+            rect = slots[index].rect
+            swept_bottom = rect.bottom + slots[index].speed
+            if self.reaches(rect, rect.top, swept_bottom, zone):
+                barrier = self.hit_barrier(rect, barriers)
+                if barrier:
+                    player_bullets.retire(index)
+                    if barrier.is_destroyed():
+                        events.append(HitEvent(BARRIER_DESTROYED, barrier))
+                    continue
+            if self.reaches(rect, rect.top, swept_bottom, fleet_bounds):
+                enemy = fleet.check_collision(rect)
+                if enemy:
+                    player_bullets.retire(index)
+                    events.append(HitEvent(ENEMY_KILLED, enemy))
+
+        # Enemy bullets travel down, so they swept the span above them
+        enemy_bullets = fleet.bullets
+        slots = enemy_bullets.slots
+        for index in range(enemy_bullets.active - 1, -1, -1):
+            rect = slots[index].rect
+            swept_top = rect.top - slots[index].speed
+            if self.reaches(rect, swept_top, rect.bottom, zone):
+                barrier = self.hit_barrier(rect, barriers)
+                if barrier:
+                    enemy_bullets.retire(index)
+                    if barrier.is_destroyed():
+                        events.append(HitEvent(BARRIER_DESTROYED, barrier))
+                    continue
+            for ship in ships:
+                if ship.rect.colliderect(rect):
+                    enemy_bullets.retire(index)
+                    events.append(HitEvent(PLAYER_HIT, ship))
+                    break
+
+        # Enemies only need eroding barriers on ticks where the fleet moved
+        if fleet.moved:
+            intact = [barrier for barrier in barriers if not barrier.is_destroyed()]
+            fleet.check_barrier_collisions(intact)
+            for barrier in intact:
+                if barrier.is_destroyed():
+                    events.append(HitEvent(BARRIER_DESTROYED, barrier))
+
+        return events
+
+    @staticmethod
+    def barrier_zone(barriers):
+        # Union of all barrier rects, grown by a pixel because touching a
+        # barrier's edge already erodes it
+        if not barriers:
+            return None
+        zone = barriers[0].rect.unionall([barrier.rect for barrier in barriers[1:]])
+        return zone.inflate(2, 2)
+
+    @staticmethod
+    def reaches(rect, swept_top, swept_bottom, area):
+        return (
+            area is not None
+            and rect.left < area.right
+            and rect.right > area.left
+            and swept_top < area.bottom
+            and swept_bottom > area.top
+        )
+
+    @staticmethod
+    def hit_barrier(rect, barriers):
+        for barrier in barriers:
+            if barrier.check_collision(rect):
+                return barrier
+        return None
@@ -1,8 +1,10 @@
-import pygame
 import os
 
 # Add this near the top of the file, after the import statements
-FONT_PATH = os.path.join("fonts", "retro-gaming.ttf")
+# Asset paths are relative to this file so the game runs from any directory
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+FONT_PATH = os.path.join(ASSET_DIR, "fonts", "retro-gaming.ttf")
+SOUND_DIR = os.path.join(ASSET_DIR, "sounds")
 
 # Screen dimensions
 WIDTH = 1024
@@ -15,6 +17,7 @@ GREEN = (0, 255, 0)
 RED = (255, 0, 0)
 YELLOW = (255, 255, 0)
 LIGHT_GRAY = (200, 200, 200)
+CYAN = (0, 255, 255)
 
 # Game settings
 FPS = 60
@@ -27,34 +30,14 @@ ENEMY_COLS = 11
 ENEMY_SPACING_X = 60  # Increased from 60
 ENEMY_SPACING_Y = 60  # Increased from 60
 ENEMY_START_Y = 110  # Decreased from 120
+ENEMY_MOVE_DELAY = 500  # Milliseconds between fleet steps on level 1
+ENEMY_MOVE_DELAY_DECREASE = 50  # Per level
+MIN_ENEMY_MOVE_DELAY = 100
+ENEMY_SHOOT_DELAY = 1000
 
 # Player settings
 PLAYER_SHOOT_COOLDOWN = 500  # Time in milliseconds between shots
 
-# Sound effects
-pygame.mixer.init()
-
-
-def load_sound(filename):
-    try:
-        return pygame.mixer.Sound(os.path.join("sounds", filename))
-    except pygame.error:
-        print(f"Warning: Unable to load sound file: {filename}")
-        return None
-
-
-SHOOT_SOUND = load_sound("shoot.wav")
-if SHOOT_SOUND:
-    SHOOT_SOUND.set_volume(0.3)
-
-EXPLOSION_SOUND = load_sound("explosion.wav")
-ENEMY_KILLED_SOUND = load_sound("invaderkilled.wav")
-ENEMY_MOVE_SOUNDS = [load_sound(f"fastinvader{i}.wav") for i in range(1, 5)]
-ENEMY_MOVE_SOUNDS = [sound for sound in ENEMY_MOVE_SOUNDS if sound is not None]
-
-# Add this to the sound effects section
-LEVEL_COMPLETE_SOUND = load_sound("level_complete.mp3")
-
 # Level settings
 LEVEL_COMPLETE_DELAY = 3000
 ENEMY_SPEED_INCREASE = 1.5
@@ -67,24 +50,22 @@ BARRIER_SIZE = (88, 64)  # Adjusted size based on the new BARRIER_DESIGN
 # Bullet settings
 BULLET_SIZE = (6, 15)  # Thinner, longer bullets
 PLAYER_BULLET_SPEED = 7  # Increased player bullet speed
-ENEMY_BULLET_SPEED = 2  # Slightly reduced enemy bullet speed
-
-
-# Add this function at the end of the file
-def set_sfx_volume(volume):
-    volume_scale = volume / 10.0
-    if SHOOT_SOUND:
-        SHOOT_SOUND.set_volume(0.3 * volume_scale)
-    if EXPLOSION_SOUND:
-        EXPLOSION_SOUND.set_volume(volume_scale)
-    if ENEMY_KILLED_SOUND:
-        ENEMY_KILLED_SOUND.set_volume(volume_scale)
-    for sound in ENEMY_MOVE_SOUNDS:
-        if sound:
-            sound.set_volume(volume_scale)
-    if LEVEL_COMPLETE_SOUND:
-        LEVEL_COMPLETE_SOUND.set_volume(volume_scale)
+ENEMY_BULLET_SPEED = 4  # Moved once per tick (was 2, applied twice per frame)
+MAX_PLAYER_BULLETS = 16  # Preallocated bullet slots
+MAX_ENEMY_BULLETS = 64
 
 
 # Add this near the other game settings
 INITIAL_LIVES = 3
+
+# Swarm stress mode (--swarm): a far bigger fleet of 1-pixel-scale invaders
+SWARM_ROWS = 40
+SWARM_COLS = 70
+SWARM_PIXEL = 1  # Sprite pixel size, 5 in the normal game
+SWARM_SPACING_X = 12
+SWARM_SPACING_Y = 9
+SWARM_START_Y = 80
+SWARM_DROP = 9
+SWARM_SHOOT_DELAY = 100
+SWARM_VOLLEY = 8  # Shots per volley
+MAX_SWARM_BULLETS = 512
@@ -0,0 +1,48 @@
+import pygame
+
+# Discrete action set shared by scripted runners and agents:
+# index -> (left, right, fire)
+ACTIONS = [
+    (False, False, False),  # NOOP
+    (True, False, False),  # LEFT
+    (False, True, False),  # RIGHT
+    (False, False, True),  # FIRE
+    (True, False, True),  # LEFT + FIRE
+    (False, True, True),  # RIGHT + FIRE
+]
+
+
+class Controls:
+    def __init__(
+        self,
+        left=False,
+        right=False,
+        fire=False,
+        restart=False,
+        debug_kill=False,
+        rewind=False,
+    ):
+        self.left = left
+        self.right = right
+        self.fire = fire
+        # Key presses that change game state go through the tick too, so a
+        # recorded session replays exactly
+        self.restart = restart
+        self.debug_kill = debug_kill
+        self.rewind = rewind  # Held: play the game backwards
+
+    @classmethod
+    def from_keyboard(cls, fire=False, restart=False, debug_kill=False):
+        keys = pygame.key.get_pressed()
+        return cls(
+            keys[pygame.K_LEFT],
+            keys[pygame.K_RIGHT],
+            fire,
+            restart,
+            debug_kill,
+            keys[pygame.K_BACKSPACE],
+        )
+
+    @classmethod
+    def from_action(cls, action):
+        return cls(*ACTIONS[action])
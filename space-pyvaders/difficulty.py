@@ -0,0 +1,45 @@
+from constants import (
+    ENEMY_SPEED,
+    ENEMY_SPEED_INCREASE,
+    ENEMY_MOVE_DELAY,
+    ENEMY_MOVE_DELAY_DECREASE,
+    MIN_ENEMY_MOVE_DELAY,
+    ENEMY_SHOOT_DELAY,
+    PLAYER_SHOOT_COOLDOWN,
+)
+
+
+class Difficulty:
+    # The knobs that decide how hard the game is, handed to Game and the
+    # fleets so a run can use other values than constants.py. Plain values
+    # only, so it pickles and round-trips through JSON.
+
+    def __init__(
+        self,
+        enemy_speed=ENEMY_SPEED,
+        enemy_speed_increase=ENEMY_SPEED_INCREASE,
+        move_delay=ENEMY_MOVE_DELAY,
+        move_delay_decrease=ENEMY_MOVE_DELAY_DECREASE,
+        min_move_delay=MIN_ENEMY_MOVE_DELAY,
+        shoot_delay=ENEMY_SHOOT_DELAY,
+        player_shoot_cooldown=PLAYER_SHOOT_COOLDOWN,
+    ):
+        self.enemy_speed = enemy_speed
+        self.enemy_speed_increase = enemy_speed_increase
+        self.move_delay = move_delay
+        self.move_delay_decrease = move_delay_decrease
+        self.min_move_delay = min_move_delay
+        self.shoot_delay = shoot_delay
+        self.player_shoot_cooldown = player_shoot_cooldown
+
+    def fleet_speed(self, level):
+        return self.enemy_speed + (level - 1) * self.enemy_speed_increase
+
+    def fleet_move_delay(self, level):
+        return max(
+            self.min_move_delay,
+            self.move_delay - (level - 1) * self.move_delay_decrease,
+        )
+
+    def as_dict(self):
+        return dict(vars(self))
@@ -1,20 +1,21 @@
-import pygame
-import random
 from constants import (
     WIDTH,
     HEIGHT,
     WHITE,
-    ENEMY_SPEED,
-    ENEMY_SPEED_INCREASE,
     ENEMY_DROP,
     ENEMY_ROWS,
     ENEMY_COLS,
     ENEMY_SPACING_X,
     ENEMY_SPACING_Y,
     ENEMY_START_Y,
-    ENEMY_MOVE_SOUNDS,
+    MAX_ENEMY_BULLETS,
 )
-from bullet import Bullet
+from assets import ENEMY_MOVE_SOUNDS
+from audio import AUDIO
+from bullet import BulletPool
+from difficulty import Difficulty
+from fleet_index import FleetGrid
+from sprites import SpriteCache, render_design, render_dissolve
 
 
 class Enemy:
@@ -87,35 +88,29 @@ class Enemy:
         self.is_dying = False
         self.death_frame = 0
         self.max_death_frames = 8
+        self.row = 0
+        self.col = 0
 
     def create_enemy_image(self):
         design = self.designs[self.current_design]
-        image = pygame.Surface(self.ENEMY_SIZE, pygame.SRCALPHA)
-        pixel_size = self.ENEMY_SIZE[0] // len(design[0])
-
-        for y, row in enumerate(design):
-            for x, pixel in enumerate(row):
-                if pixel != " ":
-                    pygame.draw.rect(
-                        image,
-                        self.color,
-                        (x * pixel_size, y * pixel_size, pixel_size, pixel_size),
-                    )
-        return image
+        return SpriteCache.get(
+            (self.enemy_type, self.current_design, 0),
+            lambda: render_design(design, self.color, self.ENEMY_SIZE),
+        )
 
     def create_death_frame(self, frame):
-        image = pygame.Surface(self.ENEMY_SIZE, pygame.SRCALPHA)
-        pixel_size = self.ENEMY_SIZE[0] // len(self.designs[0][0])
-        for y, row in enumerate(self.designs[self.current_design]):
-            for x, pixel in enumerate(row):
-                if pixel != " ":
-                    if random.random() > frame / self.max_death_frames:
-                        pygame.draw.rect(
-                            image,
-                            self.color,
-                            (x * pixel_size, y * pixel_size, pixel_size, pixel_size),
-                        )
-        return image
+        design = self.designs[self.current_design]
+        key = (self.enemy_type, self.current_design, frame)
+        return SpriteCache.get(
+            key,
+            lambda: render_dissolve(
+                design,
+                self.color,
+                self.ENEMY_SIZE,
+                key,
+                frame / self.max_death_frames,
+            ),
+        )
 
     def update(self):
         if self.is_dying:
@@ -142,24 +137,28 @@ class Enemy:
 
 
 class EnemyFleet:
-    def __init__(self, level):
+    def __init__(self, level, clock, rng, difficulty=None):
+        difficulty = difficulty or Difficulty()
+        self.clock = clock
+        self.rng = rng
         self.rows = []
         self.direction = 1
         self.move_time = 0
-        self.move_delay = max(100, 500 - (level - 1) * 50)
-        self.speed = ENEMY_SPEED + (level - 1) * ENEMY_SPEED_INCREASE
+        self.move_delay = difficulty.fleet_move_delay(level)
+        self.speed = difficulty.fleet_speed(level)
         self.create_fleet()
-        self.bullets = []
-        self.shoot_delay = 1000
-        self.last_shot = pygame.time.get_ticks()
+        self.bullets = BulletPool(MAX_ENEMY_BULLETS)
+        self.shoot_delay = difficulty.shoot_delay
+        self.last_shot = clock.get_ticks()
         self.animation_time = 0
         self.animation_delay = 500
         self.current_moving_row = 0
         self.row_move_delay = 100  # Delay between row movements in milliseconds
+        self.moved = False  # Whether any row stepped during the last update
 
     def create_fleet(self):
         enemy_types = ["small", "medium", "large"]
-        row_types = random.choices(
+        row_types = self.rng.fleet.choices(
             enemy_types, k=ENEMY_ROWS
         )  # Randomly choose types for each row
 
@@ -169,42 +168,48 @@ class EnemyFleet:
             for col in range(ENEMY_COLS):
                 x = col * ENEMY_SPACING_X + (WIDTH - ENEMY_COLS * ENEMY_SPACING_X) // 2
                 y = row * ENEMY_SPACING_Y + ENEMY_START_Y
-                row_enemies.append(Enemy(x, y, enemy_type))
+                enemy = Enemy(x, y, enemy_type)
+                enemy.col = col
+                row_enemies.append(enemy)
             self.rows.append(row_enemies)
+        self.grid = FleetGrid(self.rows)
 
-    def update(self, barriers):
-        current_time = pygame.time.get_ticks()
-        self.move(barriers)
+    def update(self):
+        current_time = self.clock.get_ticks()
+        self.moved = False
+        self.move()
 
         if current_time - self.animation_time > self.animation_delay:
             self.animation_time = current_time
             self.animate_enemies()
 
         self.shoot()
-        self.update_bullets(barriers)
 
         # Update dying enemies and remove them if fully destroyed
-        for row in self.rows:
+        for row_index, row in enumerate(self.rows):
+            if not self.grid.dying[row_index]:
+                continue
             for enemy in row[:]:
                 if enemy.is_dying:
                     if enemy.update():
                         row.remove(enemy)
+                        self.grid.remove(enemy)
 
     def animate_enemies(self):
         for row in self.rows:
             for enemy in row:
                 enemy.animate()
 
-    def move(self, barriers):
-        current_time = pygame.time.get_ticks()
+    def move(self):
+        current_time = self.clock.get_ticks()
         if current_time - self.move_time > self.move_delay:
             self.move_time = current_time
             if self.rows:  # Only move if there are rows
-                self.move_row(self.current_moving_row, barriers)
+                self.move_row(self.current_moving_row)
                 self.current_moving_row = (self.current_moving_row + 1) % len(self.rows)
             self.play_move_sound()
 
-    def move_row(self, row_index, barriers):
+    def move_row(self, row_index):
         if not self.rows or row_index >= len(self.rows):  # Check if row_index is valid
             return
 
@@ -216,12 +221,9 @@ class EnemyFleet:
         row_speed = self.speed
 
         # Check if the row needs to change direction
-        if (
-            max(enemy.rect.right for enemy in self.rows[row_index]) >= WIDTH - 10
-            and row_direction > 0
-        ) or (
-            min(enemy.rect.left for enemy in self.rows[row_index]) <= 10
-            and row_direction < 0
+        row_bounds = self.grid.row_bounds[row_index]
+        if (row_bounds.right >= WIDTH - 10 and row_direction > 0) or (
+            row_bounds.left <= 10 and row_direction < 0
         ):
             move_down = True
             self.direction *= -1
@@ -230,72 +232,86 @@ class EnemyFleet:
         # Move the row horizontally
         for enemy in self.rows[row_index]:
             enemy.move(row_speed * row_direction, 0)
+        # Rect.move_ip truncates fractional speeds toward zero
+        self.grid.move_row(row_index, int(row_speed * row_direction), 0)
 
         if move_down:
             for row in self.rows:
                 for enemy in row:
                     enemy.move(0, ENEMY_DROP)
-
-        # Check collisions with barriers
-        for enemy in self.rows[row_index]:
-            for barrier in barriers:
-                barrier.check_collision(enemy.rect)
+            for index in range(len(self.rows)):
+                self.grid.move_row(index, 0, ENEMY_DROP)
+        self.grid.update_bounds()
+        self.moved = True
 
     def shoot(self):
-        current_time = pygame.time.get_ticks()
+        current_time = self.clock.get_ticks()
         if current_time - self.last_shot > self.shoot_delay:
-            if self.enemies:
-                shooting_enemy = random.choice(self.enemies)
-                self.bullets.append(
-                    Bullet(shooting_enemy.rect.centerx, shooting_enemy.rect.bottom, 1)
+            if self.grid.front_line:
+                # Only the lowest enemy in each column can fire
+                shooting_enemy = self.rng.shots.choice(self.grid.front_line)
+                self.bullets.spawn(
+                    shooting_enemy.rect.centerx, shooting_enemy.rect.bottom, 1
                 )
                 self.last_shot = current_time
 
-    def update_bullets(self, barriers):
-        for bullet in self.bullets[:]:
-            bullet.update()
-            if bullet.rect.top > HEIGHT:
-                self.bullets.remove(bullet)
-            else:
-                for barrier in barriers:
-                    if barrier.check_collision(bullet.rect):
-                        self.bullets.remove(bullet)
-                        break
-
     def draw(self, screen):
         for row in self.rows:
             for enemy in row:
                 enemy.draw(screen)
-        for bullet in self.bullets:
-            bullet.draw(screen)
 
     def check_collision(self, bullet_rect):
-        for row in self.rows:
-            for enemy in row:
-                if enemy.rect.colliderect(bullet_rect) and not enemy.is_dying:
-                    enemy.hit()
-                    return True
-        return False
+        enemy = self.grid.hit_test(bullet_rect)
+        if enemy:
+            enemy.hit()
+            self.grid.kill(enemy)
+        return enemy
+
+    @property
+    def count(self):
+        return self.grid.count
+
+    @property
+    def bounds(self):
+        return self.grid.bounds
 
     def has_reached_bottom(self):
-        return any(enemy.rect.bottom >= HEIGHT - 50 for enemy in self.enemies)
+        bounds = self.grid.bounds
+        return bounds is not None and bounds.bottom >= HEIGHT - 50
 
     def has_hit_player(self, player):
-        return any(enemy.rect.colliderect(player.rect) for enemy in self.enemies)
+        bounds = self.grid.bounds
+        if bounds is None or not bounds.colliderect(player.rect):
+            return False
+        for row, row_bounds in zip(self.rows, self.grid.row_bounds):
+            if row_bounds and row_bounds.colliderect(player.rect):
+                if any(enemy.rect.colliderect(player.rect) for enemy in row):
+                    return True
+        return False
 
     def play_move_sound(self):
-        sound = random.choice(ENEMY_MOVE_SOUNDS)
-        sound.play()
+        AUDIO.play(self.rng.sounds.choice(ENEMY_MOVE_SOUNDS))
 
     def check_barrier_collisions(self, barriers):
-        for enemy in self.enemies:
-            for barrier in barriers:
-                barrier.check_collision(enemy.rect)
+        for row_index in range(len(self.rows)):
+            self.erode_barriers(row_index, barriers)
+
+    def erode_barriers(self, row_index, barriers):
+        row_bounds = self.grid.row_bounds[row_index]
+        if row_bounds is None:
+            return
+        # Grown by a pixel because edge contact already erodes a barrier
+        reach = row_bounds.inflate(2, 2)
+        for barrier in barriers:
+            if reach.colliderect(barrier.rect):
+                for enemy in self.rows[row_index]:
+                    barrier.check_collision(enemy.rect)
 
     def remove_all_but_one(self):
         if self.enemies:
             last_enemy = self.enemies[-1]
             self.rows = [[last_enemy]]
+            self.grid = FleetGrid(self.rows)
             self.current_moving_row = 0  # Reset current_moving_row
 
     @property
@@ -304,5 +320,6 @@ class EnemyFleet:
 
     def clear_all_enemies(self):
         self.rows = []
-        self.bullets = []
+        self.grid = FleetGrid(self.rows)
+        self.bullets.clear()
         self.current_moving_row = 0
@@ -0,0 +1,227 @@
+import argparse
+import time
+
+import sdl_dummy
+
+import numpy as np
+import pygame
+from constants import (
+    ENEMY_ROWS,
+    ENEMY_COLS,
+    ENEMY_SPACING_X,
+    SWARM_SPACING_X,
+    MAX_PLAYER_BULLETS,
+    NUM_BARRIERS,
+)
+from barrier import BARRIER_CELLS, barrier_positions
+from controls import ACTIONS, Controls
+from game import Game
+from swarm import SwarmFleet, add_swarm_argument
+
+# Status in the first column of each "enemies" cell
+EMPTY, ALIVE, DYING = range(3)
+
+
+class InvadersEnv:
+    # Gym-style interface for agents: reset(seed) and step(action) drive a
+    # window-less Game through Game.step, without the keyboard or the event
+    # queue. An action is an index into controls.ACTIONS, repeated for
+    # frame_skip ticks. Observations are a dict of fixed-shape arrays that
+    # are refilled in place on every step, so copy anything that must
+    # outlive it:
+    #   player          x, lives, level, dying
+    #   enemies         (rows, cols, 3) of status, x, y
+    #   player_bullets  (slots, 3) of active, x, y
+    #   enemy_bullets   (slots, 3) of active, x, y
+    #   barriers        (NUM_BARRIERS, cell rows, cell cols) live cells
+    #   pixels          with pixels=True, the screen as (width, height, 3)
+    #                   RGB, every downsample-th pixel
+    # The pixels are a view of the array the headless screen draws into,
+    # not a copy, so like the rest they change on the next step.
+
+    def __init__(
+        self, frame_skip=1, pixels=False, downsample=1, swarm=None, difficulty=None
+    ):
+        self.game = Game(headless=True, swarm=swarm, difficulty=difficulty)
+        self.frame_skip = frame_skip
+        self.pixels = pixels
+        self.downsample = downsample
+        self.controls = [Controls.from_action(index) for index in range(len(ACTIONS))]
+        self.barrier_index = {
+            x: index for index, (x, _) in enumerate(barrier_positions())
+        }
+        rows, cols = swarm or (ENEMY_ROWS, ENEMY_COLS)
+        # What only changes when an enemy is hit or removed, or a barrier
+        # eroded, is rebuilt then rather than every step
+        self.fleet_key = None
+        self.status = np.zeros((rows, cols), dtype=np.int64)
+        self.present = np.zeros((rows, cols), dtype=np.int64)
+        self.dying = []
+        self.origins = None
+        self.col_offsets = np.arange(cols, dtype=np.int64) * ENEMY_SPACING_X
+        self.zeros = np.zeros(cols, dtype=np.int64)
+        self.barrier_key = None
+        # (width, height, RGB) over the screen's (height, width, BGRA) array
+        step = downsample
+        self.frame = self.game.screen_pixels.transpose(1, 0, 2)[::step, ::step, 2::-1]
+        self.state = {
+            "player": np.zeros(4, dtype=np.int64),
+            "enemies": np.zeros((rows, cols, 3), dtype=np.int64),
+            "player_bullets": np.zeros((MAX_PLAYER_BULLETS, 3), dtype=np.int64),
+            "enemy_bullets": np.zeros(
+                (len(self.game.enemy_fleet.bullets.slots), 3), dtype=np.int64
+            ),
+            "barriers": np.zeros((NUM_BARRIERS,) + BARRIER_CELLS.shape, dtype=bool),
+        }
+
+    @property
+    def num_actions(self):
+        return len(ACTIONS)
+
+    def reset(self, seed=None):
+        self.game.reset_game(seed)
+        return self.observe()
+
+    def step(self, action):
+        # Returns (observation, reward, done, info); the reward is the score
+        # gained, and a game over ends the frame skip early
+        game = self.game
+        controls = self.controls[action]
+        score = game.score
+        for _ in range(self.frame_skip):
+            game.step(controls)
+            if game.game_over:
+                break
+        info = {
+            "score": game.score,
+            "level": game.level,
+            "lives": game.player.lives,
+            "frame": game.sim_clock.frame,
+        }
+        return self.observe(), game.score - score, game.game_over, info
+
+    def observe(self):
+        game = self.game
+        state = self.state
+        player = game.player
+        state["player"][:] = (
+            player.rect.x,
+            player.lives,
+            game.level,
+            player.is_dying,
+        )
+        self.observe_fleet(game.enemy_fleet, state["enemies"])
+        self.observe_bullets(game.bullets, state["player_bullets"])
+        self.observe_bullets(game.enemy_fleet.bullets, state["enemy_bullets"])
+
+        key = [(barrier, barrier.version) for barrier in game.barriers]
+        if key != self.barrier_key:
+            self.barrier_key = key
+            barriers = state["barriers"]
+            barriers[:] = False
+            for barrier in game.barriers:
+                barriers[self.barrier_index[barrier.rect.x]] = barrier.pixels
+
+        if self.pixels:
+            game.render()
+            state["pixels"] = self.frame
+        return state
+
+    def observe_fleet(self, fleet, enemies):
+        if isinstance(fleet, SwarmFleet):
+            # The dying invaders have left the grid, so only the live show
+            enemies[..., 0] = fleet.alive * ALIVE
+            enemies[..., 1] = (
+                fleet.origin_x[:, None]
+                + np.arange(fleet.num_cols, dtype=np.int64) * SWARM_SPACING_X
+            )
+            enemies[..., 2] = fleet.origin_y[:, None]
+            enemies[~fleet.alive, 1:] = 0
+            return
+
+        grid = fleet.grid
+        key = (grid, grid.count, sum(grid.dying))
+        if key != self.fleet_key:
+            self.fleet_key = key
+            self.origins = None
+            self.status[:] = EMPTY
+            self.dying = []
+            for row, cells in enumerate(grid.cells):
+                for col, enemy in enumerate(cells):
+                    if enemy is None:
+                        continue
+                    if enemy.is_dying:
+                        self.status[row, col] = DYING
+                        self.dying.append(enemy)
+                    else:
+                        self.status[row, col] = ALIVE
+            np.not_equal(self.status, EMPTY, out=self.present)
+            enemies[..., 0] = self.status
+            enemies[..., 1:] = 0
+
+        # Live enemies sit on their row's lattice slots, so positions only
+        # change when a row steps; dying ones stay where they were hit
+        if (grid.origin_x, grid.origin_y) != self.origins:
+            self.origins = (grid.origin_x[:], grid.origin_y[:])
+            rows = len(grid.cells)
+            if rows:
+                xs = enemies[:rows, :, 1]
+                ys = enemies[:rows, :, 2]
+                present = self.present[:rows]
+                np.add.outer(grid.origin_x, self.col_offsets, out=xs)
+                np.multiply(xs, present, out=xs)
+                np.add.outer(grid.origin_y, self.zeros, out=ys)
+                np.multiply(ys, present, out=ys)
+            for enemy in self.dying:
+                enemies[enemy.row, enemy.col, 1:] = enemy.rect.topleft
+
+    def observe_bullets(self, pool, bullets):
+        bullets[:] = 0
+        if pool.active:
+            bullets[: pool.active] = [
+                (1, bullet.rect.x, bullet.rect.y) for bullet in pool
+            ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Step the agent environment with random actions"
+    )
+    parser.add_argument("--steps", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--frame-skip", type=int, default=1)
+    parser.add_argument(
+        "--pixels", action="store_true", help="include the screen in observations"
+    )
+    parser.add_argument("--downsample", type=int, default=1)
+    add_swarm_argument(parser)
+    args = parser.parse_args()
+
+    env = InvadersEnv(args.frame_skip, args.pixels, args.downsample, args.swarm)
+    rng = np.random.default_rng(args.seed)
+    # Each frame is held across the next step, as an agent stacking frames
+    # would
+    observation = env.reset(args.seed)
+    games = 1
+    start = time.perf_counter()
+    for action in rng.integers(env.num_actions, size=args.steps).tolist():
+        held = observation.get("pixels")
+        observation, _, done, _ = env.step(action)
+        if done:
+            observation = env.reset()
+            games += 1
+    elapsed = time.perf_counter() - start
+    if args.pixels:
+        step = args.downsample
+        screen = pygame.surfarray.array3d(env.game.screen)[::step, ::step]
+        if not np.array_equal(held, screen):
+            raise SystemExit("pixels observation does not match the screen")
+    print(
+        f"{args.steps} steps in {elapsed:.2f}s ({args.steps / elapsed:.0f} steps/sec, "
+        f"{args.steps * args.frame_skip / elapsed:.0f} frames/sec), {games} game(s)"
+    )
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
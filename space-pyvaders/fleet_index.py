@@ -0,0 +1,105 @@
+from constants import ENEMY_COLS, ENEMY_SPACING_X
+
+
+class FleetGrid:
+    # Lattice index over EnemyFleet.rows. Every row keeps the position of its
+    # column 0 slot, so a rect maps straight to the few columns it can
+    # overlap. Non-dying enemies always sit exactly on their lattice slot;
+    # dying ones stay where they were hit but can no longer be hit or shoot.
+    #
+    # It doubles as the fleet's registry: the enemy count and the bounding
+    # boxes of every row and of the whole fleet are kept current as enemies
+    # move, die and are removed, so per-frame queries are O(1).
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.cells = []
+        self.origin_x = []
+        self.origin_y = []
+        self.sizes = []
+        self.dying = []
+        self.count = 0
+        for row_index, row in enumerate(rows):
+            cells = [None] * ENEMY_COLS
+            for enemy in row:
+                enemy.row = row_index
+                cells[enemy.col] = enemy
+            self.cells.append(cells)
+            self.dying.append(sum(enemy.is_dying for enemy in row))
+            self.count += len(row)
+            anchor = next((enemy for enemy in row if not enemy.is_dying), None)
+            if anchor:
+                self.origin_x.append(anchor.rect.x - anchor.col * ENEMY_SPACING_X)
+                self.origin_y.append(anchor.rect.y)
+                self.sizes.append(anchor.rect.size)
+            else:
+                self.origin_x.append(0)
+                self.origin_y.append(0)
+                self.sizes.append((0, 0))
+
+        self.row_bounds = [self.measure_row(index) for index in range(len(rows))]
+        self.update_bounds()
+
+        self.front = [None] * ENEMY_COLS
+        for col in range(ENEMY_COLS):
+            self.update_front(col)
+
+    def measure_row(self, row_index):
+        row = self.rows[row_index]
+        if not row:
+            return None
+        return row[0].rect.unionall([enemy.rect for enemy in row[1:]])
+
+    def update_bounds(self):
+        bounds = [rect for rect in self.row_bounds if rect]
+        self.bounds = bounds[0].unionall(bounds[1:]) if bounds else None
+
+    def move_row(self, row_index, dx, dy):
+        self.origin_x[row_index] += dx
+        self.origin_y[row_index] += dy
+        if self.row_bounds[row_index] is None:
+            return
+        if self.dying[row_index]:
+            # Dying enemies stay put, so the row no longer moves as one box
+            self.row_bounds[row_index] = self.measure_row(row_index)
+        else:
+            self.row_bounds[row_index].move_ip(dx, dy)
+
+    def kill(self, enemy):
+        self.dying[enemy.row] += 1
+        self.update_front(enemy.col)
+
+    def remove(self, enemy):
+        self.cells[enemy.row][enemy.col] = None
+        self.count -= 1
+        if enemy.is_dying:
+            self.dying[enemy.row] -= 1
+        self.row_bounds[enemy.row] = self.measure_row(enemy.row)
+        self.update_bounds()
+
+    def update_front(self, col):
+        # Lowest enemy in the column that is still able to shoot
+        self.front[col] = None
+        for cells in reversed(self.cells):
+            enemy = cells[col]
+            if enemy and not enemy.is_dying:
+                self.front[col] = enemy
+                break
+        self.front_line = [enemy for enemy in self.front if enemy]
+
+    def hit_test(self, rect):
+        # First hittable enemy overlapping rect, in the same row-major order
+        # as a full scan of the fleet would find it
+        for row_index, cells in enumerate(self.cells):
+            width, height = self.sizes[row_index]
+            top = self.origin_y[row_index]
+            if rect.bottom <= top or rect.top >= top + height:
+                continue
+            offset = self.origin_x[row_index]
+            first = max((rect.left - offset - width) // ENEMY_SPACING_X + 1, 0)
+            last = min((rect.right - offset - 1) // ENEMY_SPACING_X, ENEMY_COLS - 1)
+            for col in range(first, last + 1):
+                enemy = cells[col]
+                if enemy and not enemy.is_dying and enemy.rect.colliderect(rect):
+                    return enemy
+        return None
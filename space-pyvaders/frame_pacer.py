@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+# How long before a deadline a precise pacer stops sleeping and starts
+# yielding instead. The event loop's sleeps wake up to a millisecond late
+# (epoll only takes whole milliseconds), which would show as jitter.
+SPIN_MARGIN = 0.001
+
+
+class FramePacer:
+    # The asyncio stand-in for pygame.time.Clock. await tick(rate) returns
+    # once the next frame is due, like Clock.tick, but other coroutines run
+    # in the meantime instead of the whole thread sleeping.
+    #
+    # Deadlines are fixed steps apart rather than measured from when each
+    # frame finished, so time lost to one frame is made up in the next and
+    # the rate doesn't drift. The wait sleeps on the event loop until the
+    # deadline. A precise pacer, the one gameplay uses, sleeps until just
+    # short of it and then yields with sleep(0) until it passes: a busy
+    # wait, but one every other ready coroutine gets turns in, and it lands
+    # within microseconds of the deadline. Menus don't need that and don't
+    # pay for it. Coroutines running beside the game should still await
+    # often, since the game can only take its turn between their steps.
+
+    def __init__(self, precise=False):
+        self.precise = precise
+        self.margin = SPIN_MARGIN if precise else 0
+        self.last = time.perf_counter()
+        self.deadline = self.last
+        self.late = 0  # Frames that missed their deadline by a whole frame
+
+    def restart(self):
+        # Starts timing afresh, so time spent elsewhere isn't counted
+        self.last = time.perf_counter()
+        self.deadline = self.last
+
+    async def tick(self, rate=0):
+        # Waits for the next of rate frames a second (0 for uncapped, which
+        # only yields) and returns the milliseconds since the last tick
+        now = time.perf_counter()
+        if rate:
+            period = 1 / rate
+            self.deadline += period
+            if now - self.deadline > period:
+                # Too far behind (window dragged, debugger): start from now
+                # instead of rushing frames out to catch up
+                self.late += 1
+                self.deadline = now
+            elif self.deadline - now > self.margin:
+                await asyncio.sleep(self.deadline - now - self.margin)
+        else:
+            self.deadline = now
+        # Always yield at least once, so a frame running behind doesn't
+        # starve everything else
+        await asyncio.sleep(0)
+        while self.precise and time.perf_counter() < self.deadline:
+            await asyncio.sleep(0)
+        now = time.perf_counter()
+        elapsed = (now - self.last) * 1000
+        self.last = now
+        return elapsed
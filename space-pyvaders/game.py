@@ -1,20 +1,132 @@
+import asyncio
+import os
+import numpy as np
 import pygame
-from player import Player
+from player import Player, Partner
 from enemy import EnemyFleet
-from bullet import Bullet
+from swarm import SwarmFleet
+from difficulty import Difficulty
+from bullet import BulletPool
 from constants import *
-from barrier import Barrier
+from barrier import Barrier, barrier_positions
 from title_screen import TitleScreen
+from collisions import CollisionStage, ENEMY_KILLED, PLAYER_HIT, BARRIER_DESTROYED
+from renderer import DirtyRectRenderer
+from controls import Controls
+from sim_clock import SimClock
+from assets import ASSETS
+from audio import AUDIO
+from rng_streams import RngStreams
+from recording import InputRecording
+from state import state_hash
+from text_cache import TEXT_CACHE, GlyphAtlas
+from capture import FrameCapture
+from rewind import RewindBuffer
+from frame_pacer import FramePacer
+from netplay import NetplayOptions, play_netplay
+from profiler import (
+    FrameProfiler,
+    EVENTS,
+    PLAYER,
+    FLEET,
+    BULLETS,
+    COLLISIONS,
+    OTHER,
+    DRAW,
+    FLIP,
+)
 
 
 class Game:
-    def __init__(self):
-        pygame.init()
-        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
-        pygame.display.set_caption("Space Invaders")
-        self.clock = pygame.time.Clock()
-        self.font = pygame.font.Font(FONT_PATH, 24)
-        self.big_font = pygame.font.Font(FONT_PATH, 64)
+    def __init__(
+        self,
+        headless=False,
+        dirty_rects=False,
+        profile_path=None,
+        seed=None,
+        record_path=None,
+        swarm=None,
+        render_fps=None,
+        vsync=False,
+        difficulty=None,
+        capture_path=None,
+        rewind=None,
+        netplay=None,
+    ):
+        if dirty_rects and swarm:
+            # The renderer tracks each invader as its own sprite, which a
+            # SwarmFleet doesn't have
+            raise ValueError("dirty rectangles are not supported with a swarm")
+        if dirty_rects and render_fps is not None:
+            # The renderer redraws sprites where they are, not interpolated
+            # between ticks
+            raise ValueError("dirty rectangles are not supported with render_fps")
+        ASSETS.init()
+        self.headless = headless
+        self.screen_pixels = None
+        if headless:
+            # Off-screen surface so nothing needs a window or a video device.
+            # It draws straight into screen_pixels, an array the game owns,
+            # so the frame can be read without locking the surface. BGRA is
+            # the byte order sprites are converted to, so blits stay plain
+            # copies.
+            self.screen_pixels = np.zeros((HEIGHT, WIDTH, 4), dtype=np.uint8)
+            self.screen = pygame.image.frombuffer(
+                self.screen_pixels, (WIDTH, HEIGHT), "BGRA"
+            )
+        else:
+            self.screen = self.open_window(vsync)
+            pygame.display.set_caption("Space Invaders")
+        self.pacer = FramePacer(precise=True)
+        # None draws once per loop at FPS. A number decouples drawing from
+        # the fixed FPS simulation: frames are capped at that rate (0 for
+        # uncapped) and the player and bullets are drawn interpolated
+        # between the last two ticks, so motion is smooth at any refresh rate
+        self.render_fps = render_fps
+        self.interpolate = render_fps is not None
+        # With a path, play is recorded there at FPS, one frame per tick
+        # whatever the drawing rate
+        self.capture = None
+        self.uncaptured_ticks = 0  # Ticks since the last captured frame
+        # Set while netplay replays frames it has already played, which
+        # were captured the first time
+        self.resimulating = False
+        if capture_path:
+            self.capture = FrameCapture(capture_path, self.screen, FPS)
+        # All gameplay timing reads this clock, which only moves when the
+        # simulation steps, so outcomes don't depend on real frame times
+        self.sim_clock = SimClock()
+        self.fire_requested = False
+        self.restart_requested = False
+        self.debug_kill_requested = False
+        # All gameplay randomness. reset_game reseeds it from its "games"
+        # stream unless given a seed, so one seed fixes every later game
+        self.rng = RngStreams(seed)
+        # With a path, each session from the title screen is recorded: the
+        # first to the path itself, later ones numbered after it
+        self.record_path = record_path
+        self.recording = None
+        self.recorded_sessions = 0
+        # (rows, cols) to play against a SwarmFleet of that size instead
+        self.swarm = swarm
+        self.difficulty = difficulty or Difficulty()
+        self.collisions = CollisionStage()
+        self.renderer = DirtyRectRenderer(self.screen) if dirty_rects else None
+        # F3 toggles the profiler; with a path it starts on and dumps on exit
+        self.profiler = FrameProfiler()
+        self.profile_path = profile_path
+        self.profiler.enabled = profile_path is not None
+        self.font = ASSETS.font(24)
+        self.big_font = ASSETS.font(64)
+        self.text_cache = TEXT_CACHE
+        self.score_atlas = GlyphAtlas(self.font, WHITE)
+        self.rewind = None
+        self.rewinding = False
+        # Set while a two-player game is on: a partner ship joins the
+        # player's, sharing the score and lives
+        self.coop = False
+        # How "2 PLAYER GAME" finds the other player
+        self.netplay = netplay or NetplayOptions()
         self.reset_game()
         self.flash_timer = 0
         self.flash_interval = 500  # Flash every 500ms
@@ -25,37 +137,65 @@ class Game:
         self.title_screen = TitleScreen(self.screen)
         self.death_animation_delay = 1000  # 1 second delay after death animation
         self.death_animation_end_time = 0  # Time when death animation ends
+        # Holding backspace plays the last seconds backwards. On by default
+        # with a window; swarm fleets have no rewind.
+        if rewind is None:
+            rewind = not headless
+        if rewind and not swarm:
+            self.rewind = RewindBuffer()
+            self.rewind.reset(self)
+
+    def open_window(self, vsync):
+        if vsync:
+            try:
+                return pygame.display.set_mode((WIDTH, HEIGHT), pygame.SCALED, vsync=1)
+            except pygame.error:
+                print("Warning: VSync is not available, running without it")
+        return pygame.display.set_mode((WIDTH, HEIGHT))
 
     def create_barriers(self):
-        self.barriers = []
-        barrier_y = HEIGHT - 150  # Adjust this value to position barriers higher
-        barrier_width = BARRIER_SIZE[0]
-        gap_between_barriers = 100  # Increased from 50 to 100 (or any desired value)
-        total_width = (
-            NUM_BARRIERS * barrier_width + (NUM_BARRIERS - 1) * gap_between_barriers
-        )
-        start_x = (WIDTH - total_width) // 2
-
-        for i in range(NUM_BARRIERS):
-            x = start_x + i * (barrier_width + gap_between_barriers)
-            self.barriers.append(Barrier(x, barrier_y))
-
-    def reset_game(self):
-        self.player = Player()
+        self.barriers = [Barrier(x, y) for x, y in barrier_positions()]
+
+    def reset_game(self, seed=None, restart=False):
+        # restart is a restart from the game over screen, which stays in the
+        # rewind history like any other tick
+        if seed is None:
+            seed = self.rng.games.getrandbits(32)
+        self.rng = RngStreams(seed)
+        self.sim_clock.frame = 0
+        cooldown = self.difficulty.player_shoot_cooldown
+        if self.coop:
+            self.player = Player(self.sim_clock, cooldown, WIDTH // 3)
+            self.partner = Partner(self.sim_clock, cooldown, WIDTH * 2 // 3)
+            self.ships = [self.player, self.partner]
+        else:
+            self.player = Player(self.sim_clock, cooldown)
+            self.partner = None
+            self.ships = [self.player]
         self.level = 1
         self.create_enemy_fleet()
-        self.bullets = []
+        self.bullets = BulletPool(MAX_PLAYER_BULLETS)
         self.score = 0
         self.game_over = False
         self.level_complete = False
         self.level_complete_time = 0
+        self.death_animation_end_time = 0
         self.flash_count = 0
         self.create_barriers()
         self.player_destroyed = False
         self.player.lives = INITIAL_LIVES
+        if self.rewind is not None and not restart:
+            self.rewind.reset(self)
 
     def create_enemy_fleet(self):
-        self.enemy_fleet = EnemyFleet(self.level)
+        if self.swarm:
+            self.enemy_fleet = SwarmFleet(
+                self.level, self.sim_clock, self.rng, *self.swarm, self.difficulty
+            )
+        else:
+            self.enemy_fleet = EnemyFleet(
+                self.level, self.sim_clock, self.rng, self.difficulty
+            )
 
     def handle_events(self):
         for event in pygame.event.get():
@@ -64,35 +204,80 @@ class Game:
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     return False
-                if (
-                    event.key == pygame.K_SPACE
-                    and not self.game_over
-                    and not self.level_complete
-                    and self.player
-                    and self.player.can_shoot()
-                ):
-                    self.bullets.append(
-                        Bullet(self.player.rect.centerx, self.player.rect.top, -1)
-                    )
-                    self.player.shoot()
-                    if SHOOT_SOUND:
-                        SHOOT_SOUND.play()
+                if event.key == pygame.K_SPACE:
+                    self.fire_requested = True
+                if event.key == pygame.K_F3:
+                    self.profiler.toggle()
+                    if self.renderer:
+                        self.renderer.invalidate()
                 if event.key == pygame.K_r and self.game_over:
-                    self.reset_game()
-                    return True
+                    self.restart_requested = True
                 # Debug: Kill almost all enemies when 'W' is pressed
                 if event.key == pygame.K_F10:
-                    self.debug_kill_enemies()
+                    self.debug_kill_requested = True
         return True
 
-    def debug_kill_enemies(self):
-        if len(self.enemy_fleet.enemies) > 1:
-            self.enemy_fleet.remove_all_but_one()
-            self.score += 10 * (
-                ENEMY_ROWS * ENEMY_COLS - 1
-            )  # Add score for killed enemies
+    def fire(self, ship):
+        if not self.game_over and not self.level_complete and ship.can_shoot():
+            self.bullets.spawn(ship.rect.centerx, ship.rect.top, -1)
+            ship.shoot()
+            AUDIO.play("shoot")
 
-    def update(self):
+    def debug_kill_enemies(self):
+        fleet = self.enemy_fleet
+        if fleet.count > 1:
+            # A swarm's count includes invaders already hit and dying,
+            # which were scored then
+            alive = fleet.alive_count if self.swarm else fleet.count
+            fleet.remove_all_but_one()
+            self.score += 10 * (alive - 1)  # Add score for killed enemies
+
+    def step(self, controls, partner_controls=None):
+        # One fixed timestep of gameplay driven by the given controls, and
+        # in a co-op game the partner's
+        if self.capture and not self.resimulating:
+            self.uncaptured_ticks += 1
+        self.rewinding = controls.rewind and self.rewind is not None
+        if self.rewinding:
+            # Instead of a step forward, one back
+            self.rewind.step_back(self)
+            if self.interpolate:
+                self.save_positions()
+            self.profiler.lap(OTHER)
+            return
+        restart = controls.restart
+        debug_kill = controls.debug_kill
+        if partner_controls is not None:
+            restart = restart or partner_controls.restart
+            debug_kill = debug_kill or partner_controls.debug_kill
+        if restart and self.game_over:
+            self.reset_game(restart=True)
+        if debug_kill:
+            self.debug_kill_enemies()
+        if self.interpolate:
+            self.save_positions()
+        self.sim_clock.tick()
+        AUDIO.next_tick()
+        self.profiler.lap(OTHER)
+        if controls.fire:
+            self.fire(self.player)
+        if partner_controls is not None and partner_controls.fire:
+            self.fire(self.partner)
+        self.update(controls, partner_controls)
+        self.advance_level()
+        if self.rewind is not None:
+            self.rewind.push(self)
+        self.profiler.lap(OTHER)
+
+    def save_positions(self):
+        # Where the interpolated things were before this tick moved them
+        for ship in self.ships:
+            ship.prev_x = ship.rect.x
+        for pool in (self.bullets, self.enemy_fleet.bullets):
+            for bullet in pool:
+                bullet.prev_y = bullet.rect.y
+
+    def update(self, controls=None, partner_controls=None):
         if self.game_over:
             return
 
@@ -100,16 +285,18 @@ class Game:
             self.clear_bullets()
             return
 
-        if self.player.is_dying:
-            if self.player.update(self.barriers):
+        downed = self.downed_ship()
+        if downed and downed.is_dying:
+            if downed.update(self.barriers):
                 self.death_animation_end_time = (
-                    pygame.time.get_ticks()
+                    self.sim_clock.get_ticks()
                 )  # Record the end time
-                self.player.death_animation_complete = True  # Set the flag
+                downed.death_animation_complete = True  # Set the flag
+            self.profiler.lap(PLAYER)
             return
 
-        if self.player.death_animation_complete:
-            current_time = pygame.time.get_ticks()
+        if downed and downed.death_animation_complete:
+            current_time = self.sim_clock.get_ticks()
             if (
                 current_time - self.death_animation_end_time
                 > self.death_animation_delay
@@ -117,102 +304,83 @@ class Game:
                 self.handle_player_death()
             return
 
-        self.player.update(self.barriers)
-        self.enemy_fleet.update(self.barriers)
-        self.update_bullets()
-        self.check_collisions()
+        profiler = self.profiler
+        self.player.update(self.barriers, controls)
+        if self.partner is not None:
+            self.partner.update(self.barriers, partner_controls or Controls())
+        profiler.lap(PLAYER)
+        self.enemy_fleet.update()
+        profiler.lap(FLEET)
+        self.bullets.update()
+        self.enemy_fleet.bullets.update()
+        profiler.lap(BULLETS)
+        self.resolve_collisions()
+        profiler.lap(COLLISIONS)
 
         # Check for game over conditions first
-        if self.enemy_fleet.has_reached_bottom() or self.enemy_fleet.has_hit_player(
-            self.player
-        ):
+        if self.enemy_fleet.has_reached_bottom():
             self.trigger_game_over()
             return  # Exit the update method early if game over
+        for ship in self.ships:
+            if self.enemy_fleet.has_hit_player(ship):
+                self.trigger_game_over(ship)
+                return
 
         # Only check for level completion if the game is not over
-        if len(self.enemy_fleet.enemies) == 0 and not self.game_over:
+        if self.enemy_fleet.count == 0 and not self.game_over:
             self.level_complete = True
-            self.level_complete_time = pygame.time.get_ticks()
-            if LEVEL_COMPLETE_SOUND:
-                LEVEL_COMPLETE_SOUND.play()
+            self.level_complete_time = self.sim_clock.get_ticks()
+            AUDIO.play("level_complete")
             self.clear_bullets()  # Clear bullets when level is complete
 
     def clear_bullets(self):
         self.bullets.clear()
         self.enemy_fleet.bullets.clear()
 
-    def update_bullets(self):
-        # Player bullets
-        for bullet in self.bullets[:]:
-            bullet.update()
-            if bullet.rect.bottom < 0:
-                self.bullets.remove(bullet)
-            else:
-                for barrier in self.barriers[:]:
-                    if barrier.check_collision(bullet.rect):
-                        self.bullets.remove(bullet)
-                        if barrier.is_destroyed():
-                            self.barriers.remove(barrier)
-                        break
-                else:
-                    if self.enemy_fleet.check_collision(bullet.rect):
-                        self.bullets.remove(bullet)
-                        self.score += 10
-                        if ENEMY_KILLED_SOUND:
-                            ENEMY_KILLED_SOUND.play()
-
-        # Enemy bullets
-        for bullet in self.enemy_fleet.bullets[:]:
-            bullet.update()
-            if bullet.rect.top > HEIGHT:
-                self.enemy_fleet.bullets.remove(bullet)
-            else:
-                for barrier in self.barriers[:]:
-                    if barrier.check_collision(bullet.rect):
-                        self.enemy_fleet.bullets.remove(bullet)
-                        if barrier.is_destroyed():
-                            self.barriers.remove(barrier)
-                        break
-                else:
-                    if self.player.rect.colliderect(bullet.rect):
-                        self.enemy_fleet.bullets.remove(bullet)
-                        self.trigger_game_over()
-
-    def check_collisions(self):
-        # Player bullets hitting enemies
-        for bullet in self.bullets[:]:
-            if self.enemy_fleet.check_collision(bullet.rect):
-                self.bullets.remove(bullet)
+    def resolve_collisions(self):
+        events = self.collisions.run(
+            self.ships, self.enemy_fleet, self.bullets, self.barriers
+        )
+        for event in events:
+            if event.kind == ENEMY_KILLED:
                 self.score += 10
-                if ENEMY_KILLED_SOUND:
-                    ENEMY_KILLED_SOUND.play()
-
-        # Enemy bullets hitting player
-        for bullet in self.enemy_fleet.bullets[:]:
-            if self.player.rect.colliderect(bullet.rect):
-                self.enemy_fleet.bullets.remove(bullet)
-                self.trigger_game_over()
-
-        # Check for enemies hitting barriers
-        self.enemy_fleet.check_barrier_collisions(self.barriers)
-
-    def trigger_game_over(self):
-        if not self.game_over and not self.player.is_dying:
-            self.player.hit()
+                AUDIO.play("enemy_killed")
+            elif event.kind == PLAYER_HIT:
+                self.trigger_game_over(event.target)
+            elif event.kind == BARRIER_DESTROYED:
+                self.barriers.remove(event.target)
+
+    def downed_ship(self):
+        # The ship that was hit, until its death has played out
+        for ship in self.ships:
+            if ship.is_dying or ship.death_animation_complete:
+                return ship
+        return None
+
+    def trigger_game_over(self, ship=None):
+        # Hits the given ship, player one's by default; one ship down costs
+        # the team a life
+        if not self.game_over and self.downed_ship() is None:
+            (ship or self.player).hit()
 
     def handle_player_death(self):
+        downed = self.downed_ship()
         if self.player.lose_life():
             # Player still has lives left
-            self.player.reset()
+            for ship in self.ships:
+                ship.reset()
             self.enemy_fleet.clear_all_enemies()
             self.bullets.clear()
             self.enemy_fleet.bullets.clear()
             self.create_enemy_fleet()
-            self.player.death_animation_complete = False  # Reset the flag
+            downed.death_animation_complete = False  # Reset the flag
         else:
             # No lives left, game over
             self.game_over = True
-            self.player.death_animation_complete = False  # Reset the flag
+            downed.death_animation_complete = False  # Reset the flag
+            for ship in self.ships:
+                # The whole team shows as destroyed
+                ship.image = ship.create_death_frame(ship.max_death_frames - 1)
             self.enemy_fleet.clear_all_enemies()
             self.bullets.clear()
             self.enemy_fleet.bullets.clear()
@@ -222,89 +390,187 @@ class Game:
         self.bullets.clear()
         self.enemy_fleet.bullets.clear()
 
-    def draw(self):
+    def draw(self, alpha=1.0):
+        profiler = self.profiler
+        if self.renderer:
+            # The renderer pushes its own dirty rects, so that counts as draw
+            self.renderer.draw(self)
+            profiler.lap(DRAW)
+            if profiler.enabled:
+                pygame.display.update(profiler.draw(self.screen))
+            if self.capture:
+                self.capture_ticks()
+            profiler.lap(FLIP)
+            return
+        self.render(alpha)
+        if profiler.enabled:
+            profiler.draw(self.screen)
+        profiler.lap(DRAW)
+        pygame.display.flip()
+        if self.capture:
+            self.capture_ticks()  # Charged to flip
+        profiler.lap(FLIP)
+
+    def capture_ticks(self):
+        # The frame just shown stands in for every tick since the last one
+        # captured; frames drawn with no tick in between add nothing
+        for _ in range(self.uncaptured_ticks):
+            self.capture.grab(self.screen)
+        self.uncaptured_ticks = 0
+
+    def render(self, alpha=1.0):
+        # alpha places the player and bullets between their positions
+        # before and after the last tick; 1.0 is where they are now
         self.screen.fill(BLACK)
 
         self.enemy_fleet.draw(self.screen)
         for bullet in self.bullets:
-            bullet.draw(self.screen)
+            bullet.draw(self.screen, alpha)
         for bullet in self.enemy_fleet.bullets:
-            bullet.draw(self.screen)
+            bullet.draw(self.screen, alpha)
         for barrier in self.barriers:
             barrier.draw(self.screen)
 
-        if self.player:
-            self.player.draw(self.screen)
+        for ship in self.ships:
+            ship.draw(self.screen, alpha)
+
+        for text, image, position in self.hud_items().values():
+            self.screen.blit(image, position)
+
+    def hud_items(self):
+        # Text overlays as key -> (text, surface, position), in drawing order
+        items = {}
 
         # Draw score
-        score_text = self.font.render(f"SCORE: {self.score}", True, WHITE)
-        self.screen.blit(score_text, (10, 10))
+        score_text = f"SCORE: {self.score}"
+        image = self.score_atlas.render(score_text)
+        items["score"] = (score_text, image, (10, 10))
 
         # Draw lives just below the score
-        lives_text = self.font.render(f"LIVES: {self.player.lives}", True, WHITE)
-        self.screen.blit(lives_text, (10, 40))  # 40 pixels below the score
+        lives_text = f"LIVES: {self.player.lives}"
+        image = self.text_cache.render(self.font, lives_text, WHITE)
+        items["lives"] = (lives_text, image, (10, 40))  # 40 pixels below the score
 
         # Draw level
-        level_text = self.font.render(f"LEVEL: {self.level}", True, WHITE)
-        self.screen.blit(level_text, (WIDTH - level_text.get_width() - 10, 10))
+        level_text = f"LEVEL: {self.level}"
+        image = self.text_cache.render(self.font, level_text, WHITE)
+        items["level"] = (level_text, image, (WIDTH - image.get_width() - 10, 10))
+
+        if self.rewinding:
+            image = self.text_cache.render(self.font, "REWIND", WHITE)
+            items["rewind"] = (
+                "REWIND",
+                image,
+                (WIDTH // 2 - image.get_width() // 2, 10),
+            )
 
         if self.game_over:
-            self.draw_game_over_text()
+            image = self.text_cache.render(self.big_font, "GAME OVER", RED)
+            items["game_over"] = (
+                "GAME OVER",
+                image,
+                (WIDTH // 2 - image.get_width() // 2, HEIGHT // 2 - 50),
+            )
+            image = self.text_cache.render(self.font, "PRESS R TO RESTART", WHITE)
+            items["restart"] = (
+                "PRESS R TO RESTART",
+                image,
+                (WIDTH // 2 - image.get_width() // 2, HEIGHT // 2 + 50),
+            )
 
         if self.level_complete:
-            level_complete_text = self.big_font.render("LEVEL COMPLETE", True, GREEN)
-            self.screen.blit(
-                level_complete_text,
-                (WIDTH // 2 - level_complete_text.get_width() // 2, HEIGHT // 2 - 50),
+            image = self.text_cache.render(self.big_font, "LEVEL COMPLETE", GREEN)
+            items["level_complete"] = (
+                "LEVEL COMPLETE",
+                image,
+                (WIDTH // 2 - image.get_width() // 2, HEIGHT // 2 - 50),
             )
 
-        pygame.display.flip()
-
-    def draw_game_over_text(self):
-        game_over_text = self.big_font.render("GAME OVER", True, RED)
-        restart_text = self.font.render("PRESS R TO RESTART", True, WHITE)
-        self.screen.blit(
-            game_over_text,
-            (WIDTH // 2 - game_over_text.get_width() // 2, HEIGHT // 2 - 50),
-        )
-        self.screen.blit(
-            restart_text,
-            (WIDTH // 2 - restart_text.get_width() // 2, HEIGHT // 2 + 50),
-        )
+        return items
 
     def update_sfx_volume(self):
-        set_sfx_volume(self.title_screen.sfx_volume)
+        ASSETS.set_sfx_volume(self.title_screen.sfx_volume)
 
     def run(self):
+        asyncio.run(self.run_async())
+
+    async def run_async(self):
+        # The whole game as a coroutine. Every loop in it awaits its frame
+        # pacer between frames, so other tasks on the same event loop, such
+        # as a socket server, run while the game waits for its next frame.
         running = True
         while running:
-            action = self.title_screen.run()
+            action = await self.title_screen.run()
             if action == "QUIT":
                 running = False
             elif action == "START_GAME":
                 self.update_sfx_volume()
                 self.reset_game()
-                self.game_loop()
+                await self.game_loop()
+            elif action == "TWO_PLAYER_GAME":
+                self.update_sfx_volume()
+                await play_netplay(self, self.netplay)
 
+        if self.profile_path:
+            self.profiler.dump(self.profile_path)
+        if self.capture:
+            self.capture.close()
         pygame.quit()
 
-    def game_loop(self):
+    async def game_loop(self):
         running = True
+        elapsed = 0
+        self.pacer.restart()  # Don't count time spent on the title screen
+        if self.record_path:
+            self.recording = InputRecording(self.rng.seed, self.swarm)
+        if self.renderer:
+            self.renderer.invalidate()  # The title screen drew over everything
         while running:
+            self.profiler.begin_frame()
             running = self.handle_events()
-            self.update()
-            self.draw()
-
-            if not self.game_over and self.level_complete:
-                current_time = pygame.time.get_ticks()
-                if current_time - self.level_complete_time > LEVEL_COMPLETE_DELAY:
-                    self.level += 1
-                    self.create_enemy_fleet()
-                    self.player.reset_position()
-                    self.level_complete = False
-                    self.clear_bullets()
-
-            self.clock.tick(FPS)
+            self.profiler.lap(EVENTS)
+            for _ in range(self.sim_clock.accumulate(elapsed)):
+                controls = Controls.from_keyboard(
+                    self.fire_requested,
+                    self.restart_requested,
+                    self.debug_kill_requested,
+                )
+                self.fire_requested = False
+                self.restart_requested = False
+                self.debug_kill_requested = False
+                self.profiler.lap(EVENTS)
+                self.step(controls)
+                if self.recording is not None:
+                    self.recording.record(controls, state_hash(self))
+                    self.profiler.lap(OTHER)
+            self.draw(self.sim_clock.alpha() if self.interpolate else 1.0)
+            self.profiler.end_frame()
+            elapsed = await self.pacer.tick(
+                self.render_fps if self.interpolate else FPS
+            )
+
+        if self.recording is not None:
+            self.recording.save(self.session_record_path())
+            self.recording = None
+
+    def session_record_path(self):
+        # game.rec, then game-2.rec, game-3.rec, ...
+        self.recorded_sessions += 1
+        if self.recorded_sessions == 1:
+            return self.record_path
+        base, extension = os.path.splitext(self.record_path)
+        return f"{base}-{self.recorded_sessions}{extension}"
+
+    def advance_level(self):
+        if not self.game_over and self.level_complete:
+            current_time = self.sim_clock.get_ticks()
+            if current_time - self.level_complete_time > LEVEL_COMPLETE_DELAY:
+                self.level += 1
+                self.create_enemy_fleet()
+                for ship in self.ships:
+                    ship.reset_position()
+                self.level_complete = False
+                self.clear_bullets()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,140 @@
+import argparse
+import random
+import time
+
+import sdl_dummy
+
+import pygame
+from controls import Controls
+from game import Game
+from swarm import add_swarm_argument
+from recording import InputRecording
+from state import state_hash
+
+
+def idle_policy(rng):
+    def policy(game):
+        return Controls()
+
+    return policy
+
+
+def random_policy(rng):
+    # Holds a random direction for a random number of frames and fires
+    # whenever the cooldown allows, roughly like a frantic human
+    state = {"left": False, "right": False, "frames": 0}
+
+    def policy(game):
+        if state["frames"] <= 0:
+            direction = rng.choice((-1, 0, 1))
+            state["left"] = direction < 0
+            state["right"] = direction > 0
+            state["frames"] = rng.randint(5, 60)
+        state["frames"] -= 1
+        return Controls(state["left"], state["right"], rng.random() < 0.2)
+
+    return policy
+
+
+POLICIES = {
+    "idle": idle_policy,
+    "random": random_policy,
+}
+
+
+def run_headless(
+    frames,
+    policy="random",
+    seed=0,
+    restart=True,
+    profile=False,
+    record=False,
+    swarm=None,
+):
+    rng = random.Random(seed)
+    game = Game(headless=True, seed=seed, swarm=swarm)
+    game.profiler.enabled = profile
+    game.reset_game()
+    act = POLICIES[policy](rng)
+    recording = InputRecording(game.rng.seed, swarm) if record else None
+
+    games = 1
+    max_level = game.level
+    start = time.perf_counter()
+    for _ in range(frames):
+        controls = act(game)
+        if game.game_over and restart:
+            # Restart through the controls, like R would, so it's recorded
+            controls.restart = True
+            games += 1
+        game.profiler.begin_frame()
+        game.step(controls)
+        game.profiler.end_frame()
+        if recording is not None:
+            recording.record(controls, state_hash(game))
+        max_level = max(max_level, game.level)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "frames": frames,
+        "seconds": elapsed,
+        "fps": frames / elapsed if elapsed > 0 else float("inf"),
+        "sim_seconds": frames / game.sim_clock.rate,
+        "games": games,
+        "max_level": max_level,
+        "score": game.score,
+        "profiler": game.profiler,
+        "recording": recording,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run Space Invaders without a window, uncapped"
+    )
+    parser.add_argument("--frames", type=int, default=10000)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--no-restart",
+        action="store_true",
+        help="stop restarting the game after a game over",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="profile the update phases and dump the last frames to PATH "
+        "(.json or CSV)",
+    )
+    parser.add_argument(
+        "--record", metavar="PATH", help="save the inputs to PATH for replay.py"
+    )
+    add_swarm_argument(parser)
+    args = parser.parse_args()
+
+    stats = run_headless(
+        args.frames,
+        args.policy,
+        args.seed,
+        not args.no_restart,
+        args.profile is not None,
+        args.record is not None,
+        args.swarm,
+    )
+    print(
+        f"{stats['frames']} frames in {stats['seconds']:.2f}s "
+        f"({stats['fps']:.0f} frames/sec), {stats['sim_seconds']:.0f}s of "
+        f"gameplay simulated, {stats['games']} game(s), "
+        f"max level {stats['max_level']}, last score {stats['score']}"
+    )
+    if args.record:
+        stats["recording"].save(args.record)
+    if args.profile:
+        stats["profiler"].dump(args.profile)
+        for line in stats["profiler"].format_stats():
+            print(line)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
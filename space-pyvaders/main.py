@@ -1,10 +1,97 @@
+import time
+
+START_TIME = time.perf_counter()  # Taken first, for the cold start report
+
+import argparse
 import pygame
+from assets import ASSETS
+from constants import FPS
 from game import Game
+from netplay import DEFAULT_PORT, INPUT_DELAY, NetplayOptions, parse_address
+from swarm import add_swarm_argument
 
 
 def main():
-    pygame.init()
-    game = Game()
+    parser = argparse.ArgumentParser(description="Space Invaders")
+    parser.add_argument(
+        "--dirty-rects",
+        action="store_true",
+        help="redraw and push only the parts of the screen that changed",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="start with the frame profiler (F3) on and dump it to PATH "
+        "on exit, as JSON if PATH ends in .json and CSV otherwise",
+    )
+    parser.add_argument(
+        "--seed", type=int, help="seed the first game (default: random)"
+    )
+    parser.add_argument(
+        "--record",
+        metavar="PATH",
+        help="record each game's inputs to PATH for replay.py; later "
+        "games from the same run go to PATH-2, PATH-3 and so on, numbered "
+        "before the extension",
+    )
+    add_swarm_argument(parser)
+    parser.add_argument(
+        "--render-fps",
+        type=int,
+        metavar="N",
+        help="draw up to N frames per second (0 for uncapped) independently "
+        f"of the {FPS} Hz simulation, interpolating motion between ticks",
+    )
+    parser.add_argument(
+        "--vsync",
+        action="store_true",
+        help="sync frames to the display's refresh rate where supported",
+    )
+    parser.add_argument(
+        "--capture",
+        metavar="PATH",
+        help="record gameplay: a video file (with ffmpeg installed), a "
+        "directory for PNG frames, or any other file for raw frames",
+    )
+    parser.add_argument(
+        "--join",
+        type=parse_address,
+        metavar="HOST[:PORT]",
+        help='make "2 PLAYER GAME" join the game hosted at HOST '
+        "instead of hosting one",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help=f"UDP port to host 2 player games on (default {DEFAULT_PORT})",
+    )
+    parser.add_argument(
+        "--input-delay",
+        type=int,
+        default=INPUT_DELAY,
+        metavar="FRAMES",
+        help="frames of delay on local input in 2 player games, traded "
+        f"against rollbacks (default {INPUT_DELAY}; the host's is used)",
+    )
+    args = parser.parse_args()
+    if args.swarm and args.dirty_rects:
+        parser.error("--dirty-rects does not support --swarm")
+    if args.render_fps is not None and args.dirty_rects:
+        parser.error("--dirty-rects does not support --render-fps")
+
+    ASSETS.started_at = START_TIME
+    game = Game(
+        dirty_rects=args.dirty_rects,
+        profile_path=args.profile,
+        seed=args.seed,
+        record_path=args.record,
+        swarm=args.swarm,
+        render_fps=args.render_fps,
+        vsync=args.vsync,
+        capture_path=args.capture,
+        netplay=NetplayOptions(args.join, args.port, args.input_delay),
+    )
     game.run()
     pygame.quit()
 
@@ -0,0 +1,584 @@
+import argparse
+import asyncio
+import random
+import socket
+import struct
+import time
+from collections import deque
+
+import pygame
+from audio import AUDIO
+from constants import FPS, WIDTH, HEIGHT, WHITE, BLACK
+from controls import Controls
+from frame_pacer import FramePacer
+from profiler import EVENTS, OTHER
+from recording import LEFT, RIGHT, REWIND, encode, decode
+from state import state_hash
+
+DEFAULT_PORT = 50515
+INPUT_DELAY = 2  # Frames between reading local input and playing it
+MAX_ROLLBACK = 8  # Most frames played on guessed input, and so re-simulated
+HASH_INTERVAL = 60  # Frames between desync checks
+SYNC_INTERVAL = 10  # A side running ahead holds at most one frame in this many
+TIMEOUT = 5.0  # Seconds of silence before the peer counts as gone
+HELLO_INTERVAL = 0.25
+
+MAGIC = b"SPNP"
+PROTOCOL = 1
+HEADER = struct.Struct("<4sBB")  # magic, protocol, kind
+HELLO, WELCOME, INPUT, BYE = range(4)
+# seed, input delay
+WELCOME_BODY = struct.Struct("<IB")
+# sender's frame, peer inputs it has, frame of the first input that
+# follows, its frame advantage, a confirmed frame and its state hash
+INPUT_BODY = struct.Struct("<IIIiII")
+
+# The rewind buffer is the rollback's, so the rewind key does nothing here
+CONTROLS = [decode(byte & ~REWIND) for byte in range(256)]
+
+
+class NetplayOptions:
+    # How "2 PLAYER GAME" connects: by hosting on port, or with join set
+    # to the host's address, by joining that host
+
+    def __init__(
+        self,
+        join=None,
+        port=DEFAULT_PORT,
+        input_delay=INPUT_DELAY,
+        max_rollback=MAX_ROLLBACK,
+    ):
+        self.join = join
+        self.port = port
+        self.input_delay = input_delay
+        self.max_rollback = max_rollback
+
+
+def parse_address(text):
+    # "host" or "host:port"
+    host, _, port = text.partition(":")
+    if not host:
+        raise argparse.ArgumentTypeError(f"expected HOST[:PORT], got {text!r}")
+    try:
+        return host, int(port) if port else DEFAULT_PORT
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"bad port in {text!r}")
+
+
+def packet(kind, body=b""):
+    return HEADER.pack(MAGIC, PROTOCOL, kind) + body
+
+
+def open_socket(port=0, address=""):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((address, port))
+    sock.setblocking(False)
+    return sock
+
+
+def receive_packets(sock):
+    # Everything waiting on the socket as (kind, body, sender), skipping
+    # anything that is not one of ours
+    while True:
+        try:
+            data, sender = sock.recvfrom(2048)
+        except (BlockingIOError, InterruptedError):
+            return
+        except ConnectionError:
+            continue  # An earlier send bounced; UDP carries on regardless
+        if len(data) < HEADER.size:
+            continue
+        magic, protocol, kind = HEADER.unpack_from(data)
+        if magic == MAGIC and protocol == PROTOCOL:
+            yield kind, data[HEADER.size :], sender
+
+
+async def host(port, seed, input_delay, poll, fail):
+    # Waits for a guest's hello and welcomes it. Returns the socket, the
+    # guest's address and the welcome, or None once poll() returns False
+    # or after passing a network error to fail()
+    sock = None
+    try:
+        sock = open_socket(port)
+        welcome = packet(WELCOME, WELCOME_BODY.pack(seed, input_delay))
+        while await poll():
+            for kind, body, sender in receive_packets(sock):
+                if kind == HELLO:
+                    sock.sendto(welcome, sender)
+                    return sock, sender, welcome
+    except OSError as error:
+        await fail(f"COULD NOT HOST ON PORT {port}", error)
+    if sock:
+        sock.close()
+    return None
+
+
+async def join(address, port, poll, fail):
+    # Says hello to a host until it answers. Returns the socket, the host's
+    # address, the seed and the input delay, or None once poll() returns
+    # False or after passing a network error to fail()
+    sock = None
+    try:
+        # Looked up on the event loop's resolver, so a slow DNS server
+        # doesn't freeze the waiting screen
+        addresses = await asyncio.get_running_loop().getaddrinfo(
+            address, port, family=socket.AF_INET, type=socket.SOCK_DGRAM
+        )
+        peer = addresses[0][4]
+        sock = open_socket()
+        hello = packet(HELLO)
+        sent = 0.0
+        while await poll():
+            now = time.perf_counter()
+            if now - sent > HELLO_INTERVAL:
+                sock.sendto(hello, peer)
+                sent = now
+            for kind, body, sender in receive_packets(sock):
+                if kind == WELCOME and sender == peer:
+                    seed, input_delay = WELCOME_BODY.unpack_from(body)
+                    return sock, peer, seed, input_delay
+    except OSError as error:
+        await fail(f"COULD NOT JOIN {address}:{port}", error)
+    if sock:
+        sock.close()
+    return None
+
+
+class NetSession:
+    # One end of a two-player game over UDP, with input delay and rollback.
+    # Both ends run the whole game from the same seed and feed it the same
+    # inputs, so they stay in step without sending any state. Local input
+    # is played input_delay frames after it was read and sent at once, which
+    # on a LAN is usually soon enough to reach the peer in time. When it is
+    # not, the peer's last movement is assumed and the game carries on; if
+    # the real input turns out different, the game is stepped back to that
+    # frame through its rewind buffer and played forward again with the
+    # sound off, all within the frame that found out. No more than
+    # max_rollback frames are ever played on a guess, so that stays well
+    # inside a frame. Every packet repeats the inputs the peer has not
+    # confirmed yet, so a lost packet costs nothing but a guess.
+    #
+    # Side 0, the host, plays player one; side 1 plays the partner ship.
+
+    def __init__(
+        self,
+        sock,
+        peer,
+        side,
+        input_delay=INPUT_DELAY,
+        max_rollback=MAX_ROLLBACK,
+        latency=0.0,
+        loss=0.0,
+        clock=time.perf_counter,
+    ):
+        self.sock = sock
+        self.peer = peer
+        self.side = side
+        self.input_delay = input_delay
+        self.max_rollback = max_rollback
+        # For trying it out on one machine: outgoing packets are held back
+        # latency seconds, and a loss fraction of them dropped
+        self.latency = latency
+        self.loss = loss
+        self.loss_rng = random.Random(side)
+        self.outbox = deque()
+        self.clock = clock
+        self.welcome = None  # The host re-sends it to a repeated hello
+
+        # Inputs by frame; nobody has any for the first input_delay frames
+        self.local = bytearray(input_delay)
+        self.remote = bytearray(input_delay)  # As far as received, in order
+        self.used = bytearray()  # The peer input each frame was played with
+        self.frame = 0  # Frames played
+        self.acked = input_delay  # Local inputs the peer has
+        self.peer_frame = 0
+        self.peer_advantage = 0
+        self.rollback_to = None  # Earliest frame played on a wrong guess
+        self.hashes = {}  # Frame -> state hash, every HASH_INTERVAL frames
+        self.peer_hash = None  # (frame, hash) last reported by the peer
+        self.checked_frame = 0
+        self.last_heard = clock()
+        self.connected = True
+
+        self.rollbacks = 0
+        self.resimulated = 0
+        self.deepest = 0
+        self.slowest = 0.0
+        self.stalls = 0
+        self.checked = 0
+        self.desync = None  # First frame whose hashes differed
+
+    def alive(self):
+        return self.connected and self.clock() - self.last_heard < TIMEOUT
+
+    def confirmed(self):
+        # Frames played on real input from both sides, never to change
+        return min(self.frame, len(self.remote))
+
+    def advantage(self):
+        # How far ahead of the peer this side looks; the peer's view of the
+        # same is off by the same latency, so the two are compared
+        return self.frame - self.peer_frame
+
+    def can_advance(self):
+        if self.frame >= len(self.remote) + self.max_rollback:
+            return False  # Too far past the peer's input to guess further
+        ahead = (self.advantage() - self.peer_advantage) / 2
+        return ahead < 1 or self.frame % SYNC_INTERVAL
+
+    def advance(self, game, local_input):
+        # Plays the next frame, taking local_input for input_delay frames on
+        self.local.append(local_input)
+        self.play(game, self.frame)
+        self.frame += 1
+
+    def play(self, game, frame):
+        if frame < len(self.remote):
+            remote = self.remote[frame]
+        else:
+            # Movement is held down, but presses are one-offs, so a guess
+            # keeps only the movement
+            remote = self.remote[-1] & (LEFT | RIGHT) if self.remote else 0
+        if frame < len(self.used):
+            self.used[frame] = remote
+        else:
+            self.used.append(remote)
+        local = self.local[frame]
+        if self.side == 0:
+            game.step(CONTROLS[local], CONTROLS[remote])
+        else:
+            game.step(CONTROLS[remote], CONTROLS[local])
+        if (frame + 1) % HASH_INTERVAL == 0:
+            self.hashes[frame + 1] = state_hash(game)
+
+    def rollback(self, game):
+        # Replays everything from the earliest wrong guess with what the
+        # peer really pressed
+        if self.rollback_to is None:
+            return
+        start = time.perf_counter()
+        depth = self.frame - self.rollback_to
+        AUDIO.muted = True
+        game.resimulating = True
+        try:
+            for _ in range(depth):
+                game.rewind.step_back(game)
+            for frame in range(self.rollback_to, self.frame):
+                self.play(game, frame)
+        finally:
+            AUDIO.muted = False
+            game.resimulating = False
+        self.rollback_to = None
+        self.rollbacks += 1
+        self.resimulated += depth
+        self.deepest = max(self.deepest, depth)
+        self.slowest = max(self.slowest, time.perf_counter() - start)
+
+    def check(self):
+        # Compares the state hash the peer reported with ours for that frame
+        if self.peer_hash is None:
+            return
+        frame, value = self.peer_hash
+        if frame > self.confirmed():
+            return
+        self.peer_hash = None
+        self.checked_frame = frame
+        if frame not in self.hashes:
+            return
+        self.checked += 1
+        if value != self.hashes[frame] and self.desync is None:
+            self.desync = frame
+            print(f"Warning: netplay desync at frame {frame}")
+        for old in [old for old in self.hashes if old < frame]:
+            del self.hashes[old]
+
+    def send(self):
+        confirmed = self.confirmed()
+        hash_frame = confirmed - confirmed % HASH_INTERVAL
+        body = INPUT_BODY.pack(
+            self.frame,
+            len(self.remote),
+            self.acked,
+            self.advantage(),
+            hash_frame,
+            self.hashes.get(hash_frame, 0),
+        )
+        self.send_packet(packet(INPUT, body + self.local[self.acked :]))
+
+    def send_packet(self, data):
+        if self.loss and self.loss_rng.random() < self.loss:
+            return
+        self.outbox.append((self.clock() + self.latency, data))
+
+    def flush(self):
+        # Sends whatever has waited out the latency
+        now = self.clock()
+        while self.outbox and self.outbox[0][0] <= now:
+            self.sock.sendto(self.outbox.popleft()[1], self.peer)
+
+    def receive(self):
+        for kind, body, sender in receive_packets(self.sock):
+            if sender != self.peer:
+                continue
+            self.last_heard = self.clock()
+            if kind == INPUT:
+                self.receive_inputs(body)
+            elif kind == HELLO and self.welcome:
+                self.sock.sendto(self.welcome, self.peer)  # Ours went missing
+            elif kind == BYE:
+                self.connected = False
+
+    def receive_inputs(self, body):
+        frame, received, first, advantage, hash_frame, value = INPUT_BODY.unpack_from(
+            body
+        )
+        self.acked = max(self.acked, received)
+        if frame >= self.peer_frame:
+            self.peer_frame = frame
+            self.peer_advantage = advantage
+        if hash_frame > self.checked_frame:
+            self.peer_hash = (hash_frame, value)
+        for played, remote in enumerate(body[INPUT_BODY.size :], first):
+            if played != len(self.remote):
+                continue  # Already had it, or a gap: wait for a re-send
+            self.remote.append(remote)
+            if played < self.frame and self.used[played] != remote:
+                if self.rollback_to is None or played < self.rollback_to:
+                    self.rollback_to = played
+
+    def bye(self):
+        for _ in range(3):
+            self.sock.sendto(packet(BYE), self.peer)
+
+    def summary(self):
+        text = (
+            f"netplay: {self.frame} frames, {self.rollbacks} rollbacks "
+            f"({self.resimulated} frames re-simulated, deepest {self.deepest}, "
+            f"slowest {self.slowest * 1000:.2f} ms), {self.stalls} stalled, "
+            f"{self.checked} hashes checked"
+        )
+        if self.desync is not None:
+            text += f", DESYNC at frame {self.desync}"
+        return text
+
+
+async def play_netplay(game, options):
+    # "2 PLAYER GAME": connects as the options say, then plays co-op until
+    # either side leaves
+    if game.rewind is None:
+        print("Warning: 2 player games are not available with a swarm fleet")
+        return
+    pacer = FramePacer()
+
+    def waiting(*lines):
+        async def poll():
+            game.screen.fill(BLACK)
+            top = HEIGHT // 2 + 20 - len(lines) * 30
+            for row, line in enumerate(lines):
+                image = game.text_cache.render(game.font, line, WHITE)
+                x = WIDTH // 2 - image.get_width() // 2
+                game.screen.blit(image, (x, top + row * 60))
+            pygame.display.flip()
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return False
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                    return False
+            await pacer.tick(FPS)
+            return True
+
+        return poll
+
+    async def fail(text, error):
+        # Shows what went wrong until it is dismissed, then back to the title
+        print(f"Warning: {text.lower()}: {error}")
+        reason = error.strerror or str(error)
+        poll = waiting(text, reason.upper(), "PRESS ESC TO RETURN")
+        while await poll():
+            pass
+
+    welcome = None
+    if options.join:
+        address, port = options.join
+        connection = await join(
+            address,
+            port,
+            waiting(f"JOINING {address}:{port}", "PRESS ESC TO CANCEL"),
+            fail,
+        )
+        if connection is None:
+            return
+        sock, peer, seed, input_delay = connection
+        side = 1
+    else:
+        seed = game.rng.games.getrandbits(32)
+        input_delay = options.input_delay
+        connection = await host(
+            options.port,
+            seed,
+            input_delay,
+            waiting(
+                f"WAITING FOR PLAYER 2 ON PORT {options.port}", "PRESS ESC TO CANCEL"
+            ),
+            fail,
+        )
+        if connection is None:
+            return
+        sock, peer, welcome = connection
+        side = 0
+
+    session = NetSession(sock, peer, side, input_delay, options.max_rollback)
+    session.welcome = welcome
+    game.coop = True
+    game.reset_game(seed)
+    if game.renderer:
+        game.renderer.invalidate()
+    game.pacer.restart()
+    try:
+        running = True
+        while running and session.alive():
+            game.profiler.begin_frame()
+            running = game.handle_events()
+            game.profiler.lap(EVENTS)
+            session.receive()
+            session.rollback(game)
+            session.check()
+            game.profiler.lap(OTHER)
+            if session.can_advance():
+                controls = Controls.from_keyboard(
+                    game.fire_requested,
+                    game.restart_requested,
+                    game.debug_kill_requested,
+                )
+                game.fire_requested = False
+                game.restart_requested = False
+                game.debug_kill_requested = False
+                game.profiler.lap(EVENTS)
+                session.advance(game, encode(controls))
+            else:
+                session.stalls += 1
+            session.send()
+            session.flush()
+            game.profiler.lap(OTHER)
+            game.draw()
+            game.profiler.end_frame()
+            await game.pacer.tick(FPS)
+    finally:
+        session.bye()
+        sock.close()
+        game.coop = False
+        print(session.summary())
+
+
+def soak(args):
+    # Both ends of a game in one process, over real loopback sockets, with
+    # simulated latency and loss and random play, run as fast as possible.
+    # Afterwards the game is played once more, straight through on the
+    # inputs both sides really sent, and must match what rollback arrived at.
+    # The guest first plays a one-player game to the end, as someone who
+    # went back to the title screen would, so nothing left over from an
+    # earlier game may make the two sides differ.
+    from game import Game
+    from headless import POLICIES
+
+    now = 0.0
+
+    def clock():
+        return now
+
+    socks = [open_socket(0, "127.0.0.1") for _ in range(2)]
+    games = []
+    sessions = []
+    policies = []
+    for side in range(2):
+        game = Game(headless=True, rewind=True)
+        if side == 1:
+            act = POLICIES["random"](random.Random(args.seed))
+            while not game.game_over:
+                game.step(act(game))
+        game.coop = True
+        game.reset_game(args.seed)
+        games.append(game)
+        sessions.append(
+            NetSession(
+                socks[side],
+                socks[1 - side].getsockname(),
+                side,
+                args.input_delay,
+                args.max_rollback,
+                args.latency / 1000,
+                args.loss,
+                clock,
+            )
+        )
+        policies.append(POLICIES["random"](random.Random(args.seed + side)))
+
+    start = time.perf_counter()
+    for _ in range(args.frames):
+        now += 1 / FPS
+        for session, game, act in zip(sessions, games, policies):
+            session.receive()
+            session.rollback(game)
+            session.check()
+            if session.can_advance():
+                controls = act(game)
+                controls.restart = game.game_over
+                session.advance(game, encode(controls))
+            else:
+                session.stalls += 1
+            session.send()
+            session.flush()
+    elapsed = time.perf_counter() - start
+    for session in sessions:
+        print(session.summary())
+
+    # Straight through on the confirmed inputs, no rollback
+    confirmed = min(session.confirmed() for session in sessions)
+    reference = Game(headless=True, rewind=False)
+    reference.coop = True
+    reference.reset_game(args.seed)
+    mismatches = 0
+    for frame in range(confirmed):
+        reference.step(
+            CONTROLS[sessions[0].local[frame]], CONTROLS[sessions[1].local[frame]]
+        )
+        if (frame + 1) % HASH_INTERVAL == 0:
+            value = state_hash(reference)
+            for session in sessions:
+                expected = session.hashes.get(frame + 1)
+                if expected is not None and expected != value:
+                    mismatches += 1
+    print(
+        f"{args.frames} frames per side in {elapsed:.2f}s, {confirmed} confirmed "
+        f"and replayed without rollback: {mismatches} mismatches"
+    )
+    for sock in socks:
+        sock.close()
+    pygame.quit()
+    if mismatches or any(session.desync is not None for session in sessions):
+        raise SystemExit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Soak-test two-player rollback netplay over loopback"
+    )
+    parser.add_argument("--frames", type=int, default=FPS * 60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--latency", type=float, default=50, help="one-way delay in milliseconds"
+    )
+    parser.add_argument(
+        "--loss", type=float, default=0.05, help="fraction of packets dropped"
+    )
+    parser.add_argument("--input-delay", type=int, default=INPUT_DELAY)
+    parser.add_argument("--max-rollback", type=int, default=MAX_ROLLBACK)
+    args = parser.parse_args()
+    soak(args)
+
+
+if __name__ == "__main__":
+    # Only when run on its own: the game imports this module with a window
+    import sdl_dummy
+
+    main()
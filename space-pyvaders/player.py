@@ -1,14 +1,15 @@
-import pygame
-import random  # Add this import
 from constants import (
     WIDTH,
     HEIGHT,
     GREEN,
+    CYAN,
     PLAYER_SPEED,
     PLAYER_SHOOT_COOLDOWN,
     INITIAL_LIVES,
-    EXPLOSION_SOUND,  # Add this import
 )
+from audio import AUDIO
+from controls import Controls
+from sprites import SpriteCache, render_design, render_dissolve
 
 
 class Player:
@@ -19,17 +20,22 @@ class Player:
         "█████████",
     ]
     PLAYER_COLOR = GREEN
+    SPRITE_NAME = "player"
     PLAYER_SIZE = (len(PLAYER_DESIGN[0]) * 5, len(PLAYER_DESIGN) * 5)
     LIFE_ICON_SIZE = PLAYER_SIZE  # Make life icon the same size as player
 
-    def __init__(self):
+    def __init__(self, clock, shoot_cooldown=PLAYER_SHOOT_COOLDOWN, home_x=WIDTH // 2):
+        self.clock = clock
+        self.home_x = home_x  # Where the ship starts each life and level
+        self.shoot_cooldown = shoot_cooldown
         self.original_image = self.create_player_image()
-        self.image = self.original_image.copy()
+        self.image = self.original_image
         self.life_icon = self.create_life_icon()
         self.rect = self.image.get_rect()
         self.reset_position()
         self.speed = PLAYER_SPEED
-        self.last_shot_time = 0
+        # Long enough ago that the first shot is ready at tick 0
+        self.last_shot_time = -shoot_cooldown - 1
         self.is_dying = False
         self.death_frame = 0
         self.max_death_frames = 8  # Adjust for longer/shorter animation
@@ -37,42 +43,35 @@ class Player:
         self.death_animation_complete = False  # Add this line
 
     def create_player_image(self):
-        return self._create_image(self.PLAYER_SIZE)
+        return self._create_image(self.SPRITE_NAME, self.PLAYER_SIZE)
 
     def create_life_icon(self):
-        return self._create_image(self.LIFE_ICON_SIZE)
-
-    def _create_image(self, size):
-        pixel_size = size[0] // len(self.PLAYER_DESIGN[0])
-        image = pygame.Surface(size, pygame.SRCALPHA)
-        for y, row in enumerate(self.PLAYER_DESIGN):
-            for x, pixel in enumerate(row):
-                if pixel != " ":
-                    pygame.draw.rect(
-                        image,
-                        self.PLAYER_COLOR,
-                        (x * pixel_size, y * pixel_size, pixel_size, pixel_size),
-                    )
-        return image
+        return self._create_image("life_icon", self.LIFE_ICON_SIZE)
+
+    def _create_image(self, name, size):
+        return SpriteCache.get(
+            (name, 0, 0),
+            lambda: render_design(self.PLAYER_DESIGN, self.PLAYER_COLOR, size),
+        )
 
     def reset_position(self):
-        self.rect.midbottom = (WIDTH // 2, HEIGHT - 10)
+        self.rect.midbottom = (self.home_x, HEIGHT - 10)
+        self.prev_x = self.rect.x  # Position at the start of the tick
 
     def create_death_frame(self, frame):
-        image = pygame.Surface(self.PLAYER_SIZE, pygame.SRCALPHA)
-        pixel_size = self.PLAYER_SIZE[0] // len(self.PLAYER_DESIGN[0])
-        for y, row in enumerate(self.PLAYER_DESIGN):
-            for x, pixel in enumerate(row):
-                if pixel != " ":
-                    if random.random() > (frame + 1) / self.max_death_frames:
-                        pygame.draw.rect(
-                            image,
-                            self.PLAYER_COLOR,
-                            (x * pixel_size, y * pixel_size, pixel_size, pixel_size),
-                        )
-        return image
-
-    def update(self, barriers):
+        key = (self.SPRITE_NAME, 0, frame)
+        return SpriteCache.get(
+            key,
+            lambda: render_dissolve(
+                self.PLAYER_DESIGN,
+                self.PLAYER_COLOR,
+                self.PLAYER_SIZE,
+                key,
+                (frame + 1) / self.max_death_frames,
+            ),
+        )
+
+    def update(self, barriers, controls=None):
         if self.is_dying:
             self.death_frame += 1
             if self.death_frame >= self.max_death_frames:
@@ -85,18 +84,19 @@ class Player:
             self.image = self.create_death_frame(self.death_frame)
             return False
 
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT] and self.rect.left > 0:
+        if controls is None:
+            controls = Controls.from_keyboard()
+        if controls.left and self.rect.left > 0:
             self.rect.x -= self.speed
-        if keys[pygame.K_RIGHT] and self.rect.right < WIDTH:
+        if controls.right and self.rect.right < WIDTH:
             self.rect.x += self.speed
 
         # Check collision with barriers
         for barrier in barriers:
             if self.rect.colliderect(barrier.rect):
-                if keys[pygame.K_LEFT]:
+                if controls.left:
                     self.rect.left = barrier.rect.right
-                elif keys[pygame.K_RIGHT]:
+                elif controls.right:
                     self.rect.right = barrier.rect.left
 
         return False
@@ -105,17 +105,20 @@ class Player:
         if not self.is_dying:
             self.is_dying = True
             self.death_frame = 0
-            if EXPLOSION_SOUND:
-                EXPLOSION_SOUND.play()  # Play the explosion sound
+            AUDIO.play("explosion")  # Play the explosion sound
 
     def can_shoot(self):
-        return pygame.time.get_ticks() - self.last_shot_time > PLAYER_SHOOT_COOLDOWN
+        return self.clock.get_ticks() - self.last_shot_time > self.shoot_cooldown
 
     def shoot(self):
-        self.last_shot_time = pygame.time.get_ticks()
+        self.last_shot_time = self.clock.get_ticks()
 
-    def draw(self, screen):
-        screen.blit(self.image, self.rect)
+    def draw(self, screen, alpha=1.0):
+        if alpha == 1.0:
+            screen.blit(self.image, self.rect)
+            return
+        x = round(self.prev_x + (self.rect.x - self.prev_x) * alpha)
+        screen.blit(self.image, (x, self.rect.y))
 
     def lose_life(self):
         self.lives -= 1
@@ -125,4 +128,10 @@ class Player:
         self.reset_position()
         self.is_dying = False
         self.death_frame = 0
-        self.image = self.original_image.copy()  # Reset the image to its original state
+        self.image = self.original_image  # Reset the image to its original state
+
+
+class Partner(Player):
+    # Player two's ship in a co-op game
+    PLAYER_COLOR = CYAN
+    SPRITE_NAME = "partner"
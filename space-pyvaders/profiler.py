@@ -0,0 +1,167 @@
+import csv
+import json
+from time import perf_counter_ns
+import numpy as np
+import pygame
+from constants import FPS, WIDTH, BLACK, GREEN, RED, WHITE
+from assets import ASSETS
+from audio import AUDIO
+from text_cache import GlyphAtlas
+
+PHASES = (
+    "events",
+    "player",
+    "fleet",
+    "bullets",
+    "collisions",
+    "other",
+    "draw",
+    "flip",
+)
+EVENTS, PLAYER, FLEET, BULLETS, COLLISIONS, OTHER, DRAW, FLIP = range(len(PHASES))
+
+FRAME_BUDGET_NS = 1_000_000_000 // FPS
+OVERLAY_WIDTH = 300
+GRAPH_HEIGHT = 60
+LINE_HEIGHT = 16
+STATS_EVERY = 30  # Frames between overlay text refreshes
+
+
+class FrameProfiler:
+    # Times the phases of each frame into a ring holding the last `capacity`
+    # frames. Game code calls lap(phase) as each phase finishes, charging it
+    # the time since the previous lap, so a phase that runs several times in
+    # a frame (one per catch-up step) adds up. Time between end_frame and the
+    # next begin_frame, such as the frame limiter's sleep, is not counted.
+    # Work that is none of the gameplay phases, such as rewind snapshots,
+    # state hashes and netplay traffic, is lapped as OTHER so it isn't
+    # charged to whichever phase comes next.
+    # While disabled every call returns straight away.
+
+    def __init__(self, capacity=600):
+        self.enabled = False
+        self.capacity = capacity
+        self.samples = np.zeros((capacity, len(PHASES)), dtype=np.int64)
+        self.totals = np.zeros(capacity, dtype=np.int64)
+        self.frames = 0  # Frames recorded so far, including overwritten ones
+        self.current = [0] * len(PHASES)
+        self.start = 0
+        self.mark = 0
+        self.font = None
+        self.atlases = []
+        self.lines = []
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        if self.enabled:
+            # Turned on mid-frame; start timing from here
+            self.begin_frame()
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.start = self.mark = perf_counter_ns()
+        self.current = [0] * len(PHASES)
+
+    def lap(self, phase):
+        if not self.enabled:
+            return
+        now = perf_counter_ns()
+        self.current[phase] += now - self.mark
+        self.mark = now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        slot = self.frames % self.capacity
+        self.samples[slot] = self.current
+        self.totals[slot] = perf_counter_ns() - self.start
+        self.frames += 1
+        if self.frames % STATS_EVERY == 1:
+            self.lines = self.format_stats()
+
+    def recorded(self):
+        # Samples and totals of the frames still in the ring, oldest first
+        count = min(self.frames, self.capacity)
+        order = np.arange(self.frames - count, self.frames) % self.capacity
+        return self.samples[order], self.totals[order]
+
+    def stats(self):
+        # Milliseconds per phase, plus the whole frame under "frame"
+        samples, totals = self.recorded()
+        if not len(totals):
+            return {}
+        columns = np.column_stack([samples, totals]) / 1e6
+        p50, p95, p99 = np.percentile(columns, [50, 95, 99], axis=0)
+        means = columns.mean(axis=0)
+        return {
+            name: {
+                "mean": float(means[index]),
+                "p50": float(p50[index]),
+                "p95": float(p95[index]),
+                "p99": float(p99[index]),
+            }
+            for index, name in enumerate(PHASES + ("frame",))
+        }
+
+    def format_stats(self):
+        lines = [f"{'':<10} {'p50':>5} {'p95':>5} {'p99':>5}"]
+        for name, stat in self.stats().items():
+            lines.append(
+                f"{name:<10} {stat['p50']:5.2f} {stat['p95']:5.2f} {stat['p99']:5.2f}"
+            )
+        lines.append(AUDIO.summary())
+        return lines
+
+    def dump(self, path):
+        # JSON gets the summary and every recorded frame, anything else gets
+        # one CSV row per frame; times are in nanoseconds except the summary
+        samples, totals = self.recorded()
+        if path.endswith(".json"):
+            frames = [
+                dict(zip(PHASES + ("frame",), map(int, row)))
+                for row in np.column_stack([samples, totals])
+            ]
+            with open(path, "w") as f:
+                json.dump({"summary_ms": self.stats(), "frames_ns": frames}, f)
+            return
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(PHASES + ("frame",))
+            writer.writerows(np.column_stack([samples, totals]).tolist())
+
+    def draw(self, screen):
+        # Opaque panel at the top right: a frame time graph over the last
+        # OVERLAY_WIDTH frames, with the budget line at half its height, and
+        # per-phase percentiles in milliseconds. Returns the rect drawn to.
+        if self.font is None:
+            self.font = ASSETS.font(12)
+            self.atlases = [
+                GlyphAtlas(self.font, WHITE) for _ in range(len(PHASES) + 3)
+            ]
+        height = GRAPH_HEIGHT + LINE_HEIGHT * len(self.atlases) + 8
+        panel = pygame.Rect(WIDTH - OVERLAY_WIDTH - 10, 50, OVERLAY_WIDTH, height)
+        screen.fill(BLACK, panel)
+        pygame.draw.rect(screen, WHITE, panel, 1)
+
+        _, totals = self.recorded()
+        totals = totals[-(OVERLAY_WIDTH - 2) :]
+        bottom = panel.top + GRAPH_HEIGHT
+        budget_y = bottom - GRAPH_HEIGHT // 2
+        pygame.draw.line(
+            screen, WHITE, (panel.left + 1, budget_y), (panel.right - 2, budget_y)
+        )
+        if len(totals) > 1:
+            scale = (GRAPH_HEIGHT // 2) / FRAME_BUDGET_NS
+            heights = np.minimum(totals * scale, GRAPH_HEIGHT - 2).astype(int)
+            points = [
+                (panel.left + 1 + x, bottom - h) for x, h in enumerate(heights.tolist())
+            ]
+            color = RED if totals[-1] > FRAME_BUDGET_NS else GREEN
+            pygame.draw.lines(screen, color, False, points)
+
+        y = bottom + 4
+        for atlas, line in zip(self.atlases, self.lines):
+            screen.blit(atlas.render(line), (panel.left + 6, y))
+            y += LINE_HEIGHT
+        return panel
@@ -0,0 +1,89 @@
+import struct
+import sys
+from array import array
+from controls import Controls
+
+# File layout: header, then one input byte per tick, then one 32-bit state
+# hash per tick taken right after that tick, all little-endian
+MAGIC = b"SPVR"
+# Also bumped when a rule change makes old recordings play out differently
+VERSION = 3
+HEADER = struct.Struct("<4sBIIHH")  # magic, version, seed, ticks, swarm size
+
+LEFT = 1
+RIGHT = 2
+FIRE = 4
+RESTART = 8
+DEBUG_KILL = 16
+REWIND = 32
+
+
+def encode(controls):
+    return (
+        (LEFT if controls.left else 0)
+        | (RIGHT if controls.right else 0)
+        | (FIRE if controls.fire else 0)
+        | (RESTART if controls.restart else 0)
+        | (DEBUG_KILL if controls.debug_kill else 0)
+        | (REWIND if controls.rewind else 0)
+    )
+
+
+def decode(byte):
+    return Controls(
+        bool(byte & LEFT),
+        bool(byte & RIGHT),
+        bool(byte & FIRE),
+        bool(byte & RESTART),
+        bool(byte & DEBUG_KILL),
+        bool(byte & REWIND),
+    )
+
+
+class InputRecording:
+    # The seed a game was reset with and the controls of every tick after
+    # it, enough to play the game again exactly; the hashes let a replay
+    # check it really did
+
+    def __init__(self, seed, swarm=None):
+        self.seed = seed
+        self.swarm = swarm  # (rows, cols) of a swarm game, None otherwise
+        self.inputs = bytearray()
+        self.hashes = array("I")
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def record(self, controls, state_hash):
+        self.inputs.append(encode(controls))
+        self.hashes.append(state_hash)
+
+    def save(self, path):
+        hashes = array("I", self.hashes)
+        if sys.byteorder == "big":
+            hashes.byteswap()
+        with open(path, "wb") as f:
+            rows, cols = self.swarm or (0, 0)
+            f.write(
+                HEADER.pack(MAGIC, VERSION, self.seed, len(self.inputs), rows, cols)
+            )
+            f.write(self.inputs)
+            f.write(hashes.tobytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, seed, ticks, rows, cols = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} input recording")
+        recording = cls(seed, (rows, cols) if rows else None)
+        start = HEADER.size
+        recording.inputs = bytearray(data[start : start + ticks])
+        recording.hashes = array("I")
+        recording.hashes.frombytes(data[start + ticks : start + ticks * 5])
+        if sys.byteorder == "big":
+            recording.hashes.byteswap()
+        if len(recording.hashes) != ticks:
+            raise ValueError(f"{path} is truncated")
+        return recording
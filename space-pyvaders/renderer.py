@@ -0,0 +1,102 @@
+import pygame
+from constants import WIDTH, HEIGHT, BLACK, GREEN, WHITE
+from text_cache import GlyphAtlas
+
+
+class DirtyRectRenderer:
+    # Redraws only what changed since the last frame. Every visible thing is
+    # described by a (key, rect, token, image, color) item, where the token
+    # changes whenever its pixels do. Items whose rect or token changed mark
+    # their old and new rects dirty; each dirty rect is cleared and every
+    # item overlapping it is redrawn clipped to it, then only those rects are
+    # pushed to the display.
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.previous = {}
+        self.full_redraw = True
+        self.pixels_updated = 0
+        self.screen_area = screen.get_rect()
+        self.counter_atlas = None
+
+    def invalidate(self):
+        self.full_redraw = True
+
+    def draw(self, game):
+        items = list(self.collect(game))
+        current = {item[0]: item for item in items}
+
+        if self.full_redraw:
+            self.full_redraw = False
+            self.screen.fill(BLACK)
+            for item in items:
+                self.draw_item(item)
+            pygame.display.flip()
+            self.pixels_updated = WIDTH * HEIGHT
+            self.previous = current
+            return
+
+        dirty = []
+        for key, item in current.items():
+            old = self.previous.get(key)
+            if old is None:
+                dirty.append(item[1])
+            elif old[1] != item[1] or old[2] != item[2]:
+                if old[1].colliderect(item[1]):
+                    dirty.append(old[1].union(item[1]))
+                else:
+                    dirty.append(old[1])
+                    dirty.append(item[1])
+        for key, old in self.previous.items():
+            if key not in current:
+                dirty.append(old[1])
+        self.previous = current
+
+        dirty = [rect.clip(self.screen_area) for rect in dirty]
+        rects = [item[1] for item in items]
+        for area in dirty:
+            self.screen.set_clip(area)
+            self.screen.fill(BLACK)
+            for index in area.collidelistall(rects):
+                self.draw_item(items[index])
+        self.screen.set_clip(None)
+
+        pygame.display.update(dirty)
+        self.pixels_updated = sum(rect.w * rect.h for rect in dirty)
+
+    def draw_item(self, item):
+        key, rect, token, image, color = item
+        if image is None:
+            pygame.draw.rect(self.screen, color, rect)
+        else:
+            self.screen.blit(image, rect)
+
+    def collect(self, game):
+        # Same content and stacking order as Game.draw
+        for row in game.enemy_fleet.rows:
+            for enemy in row:
+                yield (id(enemy), enemy.rect.copy(), id(enemy.image), enemy.image, None)
+        for bullet in game.bullets:
+            yield (id(bullet), bullet.rect.copy(), GREEN, None, GREEN)
+        for bullet in game.enemy_fleet.bullets:
+            yield (id(bullet), bullet.rect.copy(), WHITE, None, WHITE)
+        for barrier in game.barriers:
+            yield (
+                id(barrier),
+                barrier.rect.copy(),
+                barrier.version,
+                barrier.image,
+                None,
+            )
+        for ship in game.ships:
+            yield (id(ship), ship.rect.copy(), id(ship.image), ship.image, None)
+
+        for key, (text, image, position) in game.hud_items().items():
+            rect = image.get_rect(topleft=position)
+            yield (key, rect, text, image, None)
+        # Pixels pushed to the display last frame, under the lives counter
+        if self.counter_atlas is None:
+            self.counter_atlas = GlyphAtlas(game.font, WHITE)
+        text = f"PX: {self.pixels_updated}"
+        image = self.counter_atlas.render(text)
+        yield ("pixels", image.get_rect(topleft=(10, 70)), text, image, None)
@@ -0,0 +1,70 @@
+import argparse
+import time
+
+import sdl_dummy
+
+import pygame
+from game import Game
+from recording import InputRecording, REWIND, decode
+from state import state_hash
+
+
+def replay(recording, verify=True):
+    # Plays a recording back without a window as fast as possible. With
+    # verify, stops at the first tick whose state hash differs from the
+    # recorded one and reports it as "diverged_at".
+    # Rewinding steps are only replayed right with the rewind buffer on
+    rewind = any(byte & REWIND for byte in recording.inputs)
+    game = Game(headless=True, swarm=recording.swarm, rewind=rewind)
+    game.reset_game(recording.seed)
+    controls = [decode(byte) for byte in range(256)]
+    hashes = recording.hashes
+
+    diverged_at = None
+    ticks = 0
+    start = time.perf_counter()
+    for tick, byte in enumerate(recording.inputs):
+        game.step(controls[byte])
+        ticks += 1
+        if verify and state_hash(game) != hashes[tick]:
+            diverged_at = tick
+            break
+    elapsed = time.perf_counter() - start
+
+    return {
+        "ticks": ticks,
+        "seconds": elapsed,
+        "fps": ticks / elapsed if elapsed > 0 else float("inf"),
+        "diverged_at": diverged_at,
+        "level": game.level,
+        "score": game.score,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay a recorded session without a window, uncapped"
+    )
+    parser.add_argument("path")
+    parser.add_argument(
+        "--no-verify",
+        action="store_true",
+        help="skip the per-tick state hash check",
+    )
+    args = parser.parse_args()
+
+    recording = InputRecording.load(args.path)
+    stats = replay(recording, not args.no_verify)
+    print(
+        f"{stats['ticks']}/{len(recording)} ticks in {stats['seconds']:.2f}s "
+        f"({stats['fps']:.0f} frames/sec), level {stats['level']}, "
+        f"score {stats['score']}"
+    )
+    pygame.quit()
+    if stats["diverged_at"] is not None:
+        print(f"State diverged from the recording at tick {stats['diverged_at']}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+import numpy as np
+from constants import (
+    FPS,
+    BULLET_SIZE,
+    ENEMY_ROWS,
+    ENEMY_COLS,
+    MAX_PLAYER_BULLETS,
+    MAX_ENEMY_BULLETS,
+    NUM_BARRIERS,
+)
+from barrier import Barrier, BARRIER_CELLS, barrier_positions
+from enemy import Enemy
+from fleet_index import FleetGrid
+
+REWIND_SECONDS = 10
+ARENA_PER_TICK = 64  # Changed fields the arena has room for per tick, on average
+
+ENEMY_TYPES = ("small", "medium", "large")
+TYPE_INDEX = {enemy_type: index for index, enemy_type in enumerate(ENEMY_TYPES)}
+
+# A snapshot is one int64 array with a fixed layout, so consecutive ones
+# line up field for field and a delta is just the fields that differ:
+#   head            game and fleet scalars in pack() order, then per ship
+#                   (player one's, and a co-op partner's): x, y, lives,
+#                   last shot, dying, death frame, death complete
+#   enemies         row count, then per grid cell: present, type, x, y,
+#                   design, dying, death frame
+#   player bullets  active count, then x, y per slot
+#   enemy bullets   the same
+#   barriers        per position: present, version, cells packed into bits
+SCALARS = 13
+SHIP_FIELDS = 7
+MAX_SHIPS = 2
+HEAD = SCALARS + MAX_SHIPS * SHIP_FIELDS
+ENEMY_FIELDS = 7
+BARRIER_BYTES = -(-BARRIER_CELLS.size // 8)
+BARRIER_WORDS = -(-BARRIER_BYTES // 8)
+BARRIER_FIELDS = 2 + BARRIER_WORDS
+
+ENEMIES = HEAD
+PLAYER_BULLETS = ENEMIES + 1 + ENEMY_ROWS * ENEMY_COLS * ENEMY_FIELDS
+ENEMY_BULLETS = PLAYER_BULLETS + 1 + MAX_PLAYER_BULLETS * 2
+BARRIERS = ENEMY_BULLETS + 1 + MAX_ENEMY_BULLETS * 2
+SNAPSHOT_SIZE = BARRIERS + NUM_BARRIERS * BARRIER_FIELDS
+SECTIONS = np.array([ENEMIES, PLAYER_BULLETS, ENEMY_BULLETS, BARRIERS])
+
+
+def pack_cells(pixels):
+    words = np.zeros(BARRIER_WORDS * 8, dtype=np.uint8)
+    words[:BARRIER_BYTES] = np.packbits(pixels)
+    return words.view(np.int64)
+
+
+def unpack_cells(words):
+    bits = np.ascontiguousarray(words, dtype=np.int64).view(np.uint8)
+    cells = np.unpackbits(bits, count=BARRIER_CELLS.size)
+    return cells.reshape(BARRIER_CELLS.shape).astype(bool)
+
+
+class RewindBuffer:
+    # The last `seconds` of ticks, for playing a game backwards. After each
+    # tick the game is packed into a snapshot, and what is kept is the undo
+    # delta back to the snapshot before it: the indices of the fields that
+    # changed and their old values, usually a dozen or so. Deltas go into
+    # one preallocated arena used as a ring, so memory stays fixed and the
+    # oldest ticks are dropped to make room. Barrier cells only show up in a
+    # delta when a barrier erodes, and RNG state is kept only for ticks that
+    # drew from it. step_back applies the newest delta and rebuilds just the
+    # parts of the game it touched.
+    #
+    # Swarm fleets are not supported.
+
+    def __init__(self, seconds=REWIND_SECONDS, rate=FPS):
+        self.capacity = seconds * rate
+        self.arena_size = self.capacity * ARENA_PER_TICK
+        self.indices = np.zeros(self.arena_size, dtype=np.int32)
+        self.values = np.zeros(self.arena_size, dtype=np.int64)
+        # Per tick: (arena offset, length, RNG state before the tick or
+        # None). Offsets only ever grow; the arena position is offset modulo
+        # its size, and a delta never wraps around the end.
+        self.ticks = [None] * self.capacity
+        self.current = np.zeros(SNAPSHOT_SIZE, dtype=np.int64)
+        self.packed = np.zeros(SNAPSHOT_SIZE, dtype=np.int64)
+        self.cells = {}  # Barrier -> (version, packed cells)
+        self.fleet_key = None
+        self.barrier_key = None
+        self.barrier_slots = {
+            x: slot for slot, (x, _) in enumerate(barrier_positions())
+        }
+        self.clear()
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.first = 0  # Slot in self.ticks of the oldest tick
+        self.count = 0
+        self.offset = 0  # Where the next delta goes
+        self.cells.clear()
+        self.fleet_key = None
+        self.barrier_key = None
+        self.rng_state = None
+        self.rng_key = None  # The streams and their draw count when last saved
+
+    def reset(self, game):
+        # Starts over from the game's current state
+        self.clear()
+        self.pack(game, self.current)
+        self.rng_state = game.rng.getstate()
+        self.rng_key = (game.rng, game.rng.draws)
+
+    def push(self, game):
+        # Call after every tick
+        packed = self.packed
+        self.pack(game, packed)
+        changed = np.flatnonzero(packed != self.current)
+        length = len(changed)
+        offset = self.reserve(length)
+        start = offset % self.arena_size
+        self.indices[start : start + length] = changed
+        self.values[start : start + length] = self.current[changed]
+        self.current, self.packed = packed, self.current
+        self.offset = offset + length
+
+        rng_state = None
+        # A restart replaces the streams, so they are compared too
+        key = (game.rng, game.rng.draws)
+        if key != self.rng_key:
+            rng_state = self.rng_state
+            self.rng_state = game.rng.getstate()
+            self.rng_key = key
+
+        if self.count == self.capacity:
+            self.drop_oldest()
+        self.ticks[(self.first + self.count) % self.capacity] = (
+            offset,
+            length,
+            rng_state,
+        )
+        self.count += 1
+
+    def reserve(self, length):
+        # The offset for a delta of `length` fields, dropping the oldest
+        # ticks whose deltas it would overwrite
+        offset = self.offset
+        room = self.arena_size - offset % self.arena_size
+        if length > room:
+            offset += room
+        oldest = offset + length - self.arena_size
+        while self.count and self.ticks[self.first][0] < oldest:
+            self.drop_oldest()
+        return offset
+
+    def drop_oldest(self):
+        self.ticks[self.first] = None
+        self.first = (self.first + 1) % self.capacity
+        self.count -= 1
+
+    def step_back(self, game):
+        # Puts the game back where it was one tick earlier; False when there
+        # is nothing left to rewind
+        if not self.count:
+            return False
+        self.count -= 1
+        slot = (self.first + self.count) % self.capacity
+        offset, length, rng_state = self.ticks[slot]
+        self.ticks[slot] = None
+        self.offset = offset
+        start = offset % self.arena_size
+        changed = self.indices[start : start + length]
+        self.current[changed] = self.values[start : start + length]
+        if rng_state is not None:
+            game.rng.setstate(rng_state)
+            self.rng_state = rng_state
+        self.rng_key = (game.rng, game.rng.draws)
+        self.restore(game, self.current, changed)
+        self.fleet_key = None
+        self.barrier_key = None
+        return True
+
+    def pack(self, game, out):
+        fleet = game.enemy_fleet
+        out[:SCALARS] = (
+            game.sim_clock.frame,
+            game.score,
+            game.level,
+            game.game_over,
+            game.level_complete,
+            game.level_complete_time,
+            game.death_animation_end_time,
+            fleet.direction,
+            fleet.move_time,
+            fleet.last_shot,
+            fleet.animation_time,
+            fleet.current_moving_row,
+            fleet.moved,
+        )
+        ships = out[SCALARS:HEAD].reshape(MAX_SHIPS, SHIP_FIELDS)
+        ships[len(game.ships) :] = 0
+        ships[: len(game.ships)] = [
+            (
+                ship.rect.x,
+                ship.rect.y,
+                ship.lives,
+                ship.last_shot_time,
+                ship.is_dying,
+                ship.death_frame,
+                ship.death_animation_complete,
+            )
+            for ship in game.ships
+        ]
+
+        # Enemies only change when a row steps, the fleet animates, or one
+        # is hit, dies or goes; otherwise they are as in the last snapshot
+        grid = fleet.grid
+        key = (grid, grid.count, fleet.animation_time)
+        if key == self.fleet_key and not fleet.moved and not any(grid.dying):
+            out[ENEMIES:PLAYER_BULLETS] = self.current[ENEMIES:PLAYER_BULLETS]
+        else:
+            self.fleet_key = key
+            self.pack_fleet(fleet, out)
+
+        for pool, start in (
+            (game.bullets, PLAYER_BULLETS),
+            (fleet.bullets, ENEMY_BULLETS),
+        ):
+            out[start] = pool.active
+            bullets = out[start + 1 : start + 1 + len(pool.slots) * 2].reshape(-1, 2)
+            bullets[pool.active :] = 0
+            if pool.active:
+                bullets[: pool.active] = [
+                    (bullet.rect.x, bullet.rect.y) for bullet in pool
+                ]
+
+        key = [(barrier, barrier.version) for barrier in game.barriers]
+        if key == self.barrier_key:
+            out[BARRIERS:] = self.current[BARRIERS:]
+            return
+        self.barrier_key = key
+        barriers = out[BARRIERS:].reshape(-1, BARRIER_FIELDS)
+        barriers[:] = 0
+        for barrier in game.barriers:
+            fields = barriers[self.barrier_slots[barrier.rect.x]]
+            fields[0] = 1
+            fields[1] = barrier.version
+            fields[2:] = self.packed_cells(barrier)
+
+    def pack_fleet(self, fleet, out):
+        out[ENEMIES] = len(fleet.rows)
+        enemies = out[ENEMIES + 1 : PLAYER_BULLETS].reshape(-1, ENEMY_FIELDS)
+        enemies[:] = 0
+        cells = []
+        fields = []
+        for row in fleet.rows:
+            for enemy in row:
+                cells.append(enemy.row * ENEMY_COLS + enemy.col)
+                fields += (
+                    1,
+                    TYPE_INDEX[enemy.enemy_type],
+                    enemy.rect.x,
+                    enemy.rect.y,
+                    enemy.current_design,
+                    enemy.is_dying,
+                    enemy.death_frame,
+                )
+        if cells:
+            enemies[cells] = np.array(fields).reshape(-1, ENEMY_FIELDS)
+
+    def packed_cells(self, barrier):
+        cached = self.cells.get(barrier)
+        if cached is None or cached[0] != barrier.version:
+            cached = self.cells[barrier] = (
+                barrier.version,
+                pack_cells(barrier.pixels),
+            )
+        return cached[1]
+
+    def restore(self, game, values, changed):
+        # Makes the game match the snapshot in `values`. The head is always
+        # restored, the other sections only when `changed` reaches into them.
+        (
+            game.sim_clock.frame,
+            game.score,
+            game.level,
+            game_over,
+            level_complete,
+            game.level_complete_time,
+            game.death_animation_end_time,
+            fleet_direction,
+            fleet_move_time,
+            fleet_last_shot,
+            fleet_animation_time,
+            fleet_moving_row,
+            fleet_moved,
+        ) = values[:SCALARS].tolist()
+        game.game_over = bool(game_over)
+        game.level_complete = bool(level_complete)
+
+        ships = values[SCALARS:HEAD].reshape(MAX_SHIPS, SHIP_FIELDS).tolist()
+        for ship, fields in zip(game.ships, ships):
+            self.restore_ship(ship, fields, game.game_over)
+
+        # A rewind can cross back over a level change
+        fleet = game.enemy_fleet
+        fleet.speed = game.difficulty.fleet_speed(game.level)
+        fleet.move_delay = game.difficulty.fleet_move_delay(game.level)
+        fleet.direction = fleet_direction
+        fleet.move_time = fleet_move_time
+        fleet.last_shot = fleet_last_shot
+        fleet.animation_time = fleet_animation_time
+        fleet.current_moving_row = fleet_moving_row
+        fleet.moved = bool(fleet_moved)
+
+        touched = np.bincount(
+            np.searchsorted(SECTIONS, changed, side="right"), minlength=5
+        )
+        if touched[1]:
+            self.restore_fleet(fleet, values)
+        if touched[2]:
+            self.restore_bullets(game.bullets, values, PLAYER_BULLETS, -1)
+        if touched[3]:
+            self.restore_bullets(fleet.bullets, values, ENEMY_BULLETS, 1)
+        if touched[4]:
+            self.restore_barriers(game, values)
+
+    def restore_ship(self, ship, fields, game_over):
+        x, y, lives, last_shot_time, is_dying, death_frame, death_complete = fields
+        ship.rect.topleft = (x, y)
+        ship.prev_x = x
+        ship.lives = lives
+        ship.last_shot_time = last_shot_time
+        ship.is_dying = bool(is_dying)
+        ship.death_frame = death_frame
+        ship.death_animation_complete = bool(death_complete)
+        if ship.is_dying and death_frame:
+            ship.image = ship.create_death_frame(death_frame)
+        elif ship.death_animation_complete or game_over:
+            # The last frame of the dissolve stays up until the ship respawns
+            ship.image = ship.create_death_frame(ship.max_death_frames - 1)
+        else:
+            ship.image = ship.original_image
+
+    def restore_fleet(self, fleet, values):
+        # Enemies already in the right cell are kept, so mostly this only
+        # moves rects
+        cells = values[ENEMIES + 1 : PLAYER_BULLETS].reshape(
+            ENEMY_ROWS, ENEMY_COLS, ENEMY_FIELDS
+        )
+        previous = fleet.grid.cells
+        fleet.rows = []
+        for row_index in range(values[ENEMIES]):
+            row = []
+            for col, fields in enumerate(cells[row_index].tolist()):
+                present, type_index, x, y, design, dying, death_frame = fields
+                if not present:
+                    continue
+                enemy_type = ENEMY_TYPES[type_index]
+                enemy = None
+                if row_index < len(previous):
+                    enemy = previous[row_index][col]
+                if enemy is None or enemy.enemy_type != enemy_type:
+                    enemy = Enemy(x, y, enemy_type)
+                    enemy.col = col
+                enemy.rect.topleft = (x, y)
+                enemy.current_design = design
+                enemy.is_dying = bool(dying)
+                enemy.death_frame = death_frame
+                if enemy.is_dying and death_frame:
+                    enemy.image = enemy.create_death_frame(death_frame)
+                else:
+                    enemy.image = enemy.create_enemy_image()
+                row.append(enemy)
+            fleet.rows.append(row)
+        fleet.grid = FleetGrid(fleet.rows)
+
+    def restore_bullets(self, pool, values, start, direction):
+        pool.active = int(values[start])
+        positions = values[start + 1 : start + 1 + pool.active * 2].reshape(-1, 2)
+        for bullet, (x, y) in zip(pool.slots, positions.tolist()):
+            bullet.reset(x + BULLET_SIZE[0] // 2, y, direction)
+
+    def restore_barriers(self, game, values):
+        existing = {barrier.rect.x: barrier for barrier in game.barriers}
+        game.barriers = []
+        for (x, y), fields in zip(
+            barrier_positions(), values[BARRIERS:].reshape(-1, BARRIER_FIELDS)
+        ):
+            if not fields[0]:
+                continue
+            barrier = existing.get(x) or Barrier(x, y)
+            if not np.array_equal(self.packed_cells(barrier), fields[2:]):
+                barrier.pixels[...] = unpack_cells(fields[2:])
+                barrier.live_cells = int(barrier.pixels.sum())
+                barrier.image = barrier.create_image()
+            # Versions only count up between rewinds, so the one restored
+            # still names exactly these cells
+            barrier.version = int(fields[1])
+            self.cells[barrier] = (barrier.version, fields[2:].copy())
+            game.barriers.append(barrier)
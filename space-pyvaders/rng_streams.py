@@ -0,0 +1,43 @@
+import random
+
+STREAMS = ("games", "fleet", "shots", "sounds")
+
+
+class CountingRandom(random.Random):
+    # Counts its draws, so callers can tell that the state moved without
+    # fetching and comparing whole Mersenne Twister states. Every method
+    # draws through these two, so the numbers are the same as Random's.
+
+    draws = 0
+
+    def random(self):
+        self.draws += 1
+        return super().random()
+
+    def getrandbits(self, k):
+        self.draws += 1
+        return super().getrandbits(k)
+
+
+class RngStreams:
+    # One random.Random per subsystem, all derived from a single seed, so
+    # that e.g. playing an extra sound never shifts where enemies shoot.
+    # "games" only seeds the next game on a restart.
+
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(32)
+        self.seed = seed
+        for name in STREAMS:
+            setattr(self, name, CountingRandom(f"{seed}:{name}"))
+
+    @property
+    def draws(self):
+        return sum(getattr(self, name).draws for name in STREAMS)
+
+    def getstate(self):
+        return tuple(getattr(self, name).getstate() for name in STREAMS)
+
+    def setstate(self, state):
+        for name, stream_state in zip(STREAMS, state):
+            getattr(self, name).setstate(stream_state)
@@ -0,0 +1,7 @@
+import os
+
+# Imported first by the entry points that run without a window. SDL reads
+# these when pygame initializes its video and audio subsystems, so they
+# must be set before that; worker processes inherit them.
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
@@ -0,0 +1,34 @@
+from constants import FPS
+
+
+class SimClock:
+    def __init__(self, rate=FPS, max_steps=5):
+        self.rate = rate
+        self.step_ms = 1000 / rate
+        self.max_steps = max_steps  # Most catch-up steps allowed per frame
+        self.frame = 0
+        self.accumulator = 0.0
+
+    def get_ticks(self):
+        # Simulated milliseconds, advancing by exactly one step per tick
+        return self.frame * 1000 // self.rate
+
+    def tick(self):
+        self.frame += 1
+
+    def alpha(self):
+        # How far real time is past the last step, as a fraction of a step
+        return min(self.accumulator / self.step_ms, 1.0)
+
+    def accumulate(self, elapsed_ms):
+        # Banks real elapsed time and returns how many fixed steps are due
+        self.accumulator += elapsed_ms
+        steps = int(self.accumulator // self.step_ms)
+        if steps > self.max_steps:
+            # Too far behind (window dragged, debugger): drop the backlog
+            # instead of spiralling into ever longer frames
+            steps = self.max_steps
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= steps * self.step_ms
+        return steps
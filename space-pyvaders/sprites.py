@@ -0,0 +1,38 @@
+import random
+import pygame
+
+
+def render_design(design, color, size, keep_pixel=None):
+    image = pygame.Surface(size, pygame.SRCALPHA)
+    pixel_size = size[0] // len(design[0])
+    for y, row in enumerate(design):
+        for x, pixel in enumerate(row):
+            if pixel != " " and (keep_pixel is None or keep_pixel()):
+                pygame.draw.rect(
+                    image,
+                    color,
+                    (x * pixel_size, y * pixel_size, pixel_size, pixel_size),
+                )
+    return image
+
+
+def render_dissolve(design, color, size, key, threshold):
+    # Each dissolve frame gets its own RNG seeded from its cache key, so the
+    # fixed set of frames looks the same every run and never touches the
+    # global random stream used by gameplay
+    rng = random.Random(repr(key))
+    return render_design(design, color, size, lambda: rng.random() > threshold)
+
+
+class SpriteCache:
+    # Shared across all instances; keyed by (sprite type, design frame,
+    # death frame) with death frame 0 being the intact sprite. Surfaces
+    # handed out are shared and must never be drawn on.
+    frames = {}
+
+    @classmethod
+    def get(cls, key, build):
+        image = cls.frames.get(key)
+        if image is None:
+            image = cls.frames[key] = build()
+        return image
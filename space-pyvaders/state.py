@@ -0,0 +1,78 @@
+import zlib
+from array import array
+from swarm import SwarmFleet
+
+
+def pack_state(game):
+    # Everything that decides how the game plays on, as a flat int array.
+    # Sprites and sounds are left out; they follow from what is packed.
+    player = game.player
+    fleet = game.enemy_fleet
+    values = [
+        game.sim_clock.frame,
+        game.score,
+        game.level,
+        game.game_over,
+        game.level_complete,
+        game.level_complete_time,
+        game.death_animation_end_time,
+        player.rect.x,
+        player.rect.y,
+        player.lives,
+        player.last_shot_time,
+        player.is_dying,
+        player.death_frame,
+        player.death_animation_complete,
+        fleet.direction,
+        fleet.move_time,
+        fleet.last_shot,
+        fleet.animation_time,
+        fleet.current_moving_row,
+        fleet.count,
+    ]
+    if game.partner is not None:
+        partner = game.partner
+        values += (
+            partner.rect.x,
+            partner.rect.y,
+            partner.last_shot_time,
+            partner.is_dying,
+            partner.death_frame,
+            partner.death_animation_complete,
+        )
+    if isinstance(fleet, SwarmFleet):
+        values += fleet.origin_x.tolist()
+        values += fleet.origin_y.tolist()
+        values.append(fleet.design)
+        values.append(zlib.crc32(fleet.alive.tobytes()))
+        for entry in fleet.dying:
+            values += entry
+    else:
+        for row in fleet.rows:
+            values.append(len(row))
+            for enemy in row:
+                values += (
+                    enemy.col,
+                    enemy.rect.x,
+                    enemy.rect.y,
+                    enemy.current_design,
+                    enemy.is_dying,
+                    enemy.death_frame,
+                )
+    for pool in (game.bullets, fleet.bullets):
+        values.append(pool.active)
+        for bullet in pool:
+            values += (bullet.rect.x, bullet.rect.y, bullet.direction)
+    values.append(len(game.barriers))
+    for barrier in game.barriers:
+        values += (barrier.rect.x, barrier.version, barrier.live_cells)
+    return array("q", values)
+
+
+def state_hash(game):
+    # CRC of the packed state plus every barrier's cells, as an unsigned
+    # 32-bit int
+    crc = zlib.crc32(pack_state(game).tobytes())
+    for barrier in game.barriers:
+        crc = zlib.crc32(barrier.pixels.tobytes(), crc)
+    return crc
@@ -0,0 +1,385 @@
+import argparse
+import math
+import numpy as np
+import pygame
+from constants import (
+    WIDTH,
+    HEIGHT,
+    ENEMY_ROWS,
+    SWARM_ROWS,
+    SWARM_COLS,
+    SWARM_PIXEL,
+    SWARM_SPACING_X,
+    SWARM_SPACING_Y,
+    SWARM_START_Y,
+    SWARM_DROP,
+    SWARM_SHOOT_DELAY,
+    ENEMY_SHOOT_DELAY,
+    SWARM_VOLLEY,
+    MAX_SWARM_BULLETS,
+)
+from assets import ENEMY_MOVE_SOUNDS
+from audio import AUDIO
+from bullet import BulletPool
+from difficulty import Difficulty
+from enemy import Enemy
+from sprites import SpriteCache, render_design, render_dissolve
+
+ENEMY_TYPES = ("small", "medium", "large")
+DEATH_FRAMES = 8
+
+
+def sprite_size(type_index):
+    design = Enemy.ENEMY_DESIGNS[ENEMY_TYPES[type_index]][0]
+    return (len(design[0]) * SWARM_PIXEL, len(design) * SWARM_PIXEL)
+
+
+def swarm_sprite(type_index, design, frame):
+    enemy_type = ENEMY_TYPES[type_index]
+    pattern = Enemy.ENEMY_DESIGNS[enemy_type][design]
+    color = Enemy.ENEMY_COLORS[enemy_type]
+    size = sprite_size(type_index)
+    key = ("swarm_" + enemy_type, design, frame)
+    if frame == 0:
+        return SpriteCache.get(key, lambda: render_design(pattern, color, size))
+    return SpriteCache.get(
+        key,
+        lambda: render_dissolve(pattern, color, size, key, frame / DEATH_FRAMES),
+    )
+
+
+def parse_swarm_size(text):
+    # "ROWSxCOLS" from the command line
+    try:
+        rows, cols = (int(part) for part in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected ROWSxCOLS, got {text!r}")
+    if rows < 1 or cols < 1:
+        raise argparse.ArgumentTypeError("the swarm needs at least one invader")
+    return rows, cols
+
+
+def add_swarm_argument(parser):
+    parser.add_argument(
+        "--swarm",
+        nargs="?",
+        const=(SWARM_ROWS, SWARM_COLS),
+        type=parse_swarm_size,
+        metavar="ROWSxCOLS",
+        help="stress mode with a much bigger fleet "
+        f"(default size {SWARM_ROWS}x{SWARM_COLS})",
+    )
+
+
+class SwarmFleet:
+    # Stand-in for EnemyFleet in the swarm stress mode, with the same
+    # interface, for thousands of invaders. There is no Enemy object per
+    # invader: every row keeps the position of its column 0 slot and an
+    # alive mask, so stepping rows, finding edges and hit testing are a few
+    # array operations. A row is drawn as one strip per animation frame,
+    # rebuilt only when someone in it dies. Dying invaders leave the lattice
+    # and play out their death frames where they were hit.
+    #
+    # Rows step in bands of rows / ENEMY_ROWS, so a sweep of the whole
+    # swarm takes as long as one of the normal fleet.
+
+    def __init__(
+        self, level, clock, rng, rows=SWARM_ROWS, cols=SWARM_COLS, difficulty=None
+    ):
+        difficulty = difficulty or Difficulty()
+        self.clock = clock
+        self.rng = rng
+        self.num_rows = rows
+        self.num_cols = cols
+        self.direction = 1
+        self.move_time = 0
+        self.move_delay = difficulty.fleet_move_delay(level)
+        self.speed = difficulty.fleet_speed(level)
+        self.band = math.ceil(rows / ENEMY_ROWS)
+        self.create_fleet()
+        self.bullets = BulletPool(MAX_SWARM_BULLETS)
+        # Scaled so the swarm stays this much more trigger-happy
+        self.shoot_delay = (
+            difficulty.shoot_delay * SWARM_SHOOT_DELAY // ENEMY_SHOOT_DELAY
+        )
+        self.last_shot = clock.get_ticks()
+        self.animation_time = 0
+        self.animation_delay = 500
+        self.design = 0
+        self.current_moving_row = 0
+        self.moved = False
+
+    def create_fleet(self):
+        rows, cols = self.num_rows, self.num_cols
+        self.row_type = np.array(
+            self.rng.fleet.choices(range(len(ENEMY_TYPES)), k=rows), dtype=np.intp
+        )
+        sizes = np.array([sprite_size(index) for index in range(len(ENEMY_TYPES))])
+        self.widths = sizes[self.row_type, 0]
+        self.heights = sizes[self.row_type, 1]
+        self.origin_x = np.full(
+            rows, (WIDTH - cols * SWARM_SPACING_X) // 2, dtype=np.int64
+        )
+        self.origin_y = (
+            SWARM_START_Y + np.arange(rows, dtype=np.int64) * SWARM_SPACING_Y
+        )
+        self.alive = np.ones((rows, cols), dtype=bool)
+        self.row_count = np.full(rows, cols, dtype=np.int64)
+        self.first_col = np.zeros(rows, dtype=np.int64)
+        self.last_col = np.full(rows, cols - 1, dtype=np.int64)
+        self.alive_count = rows * cols
+        self.dying = []  # [x, y, type, design, frame] per dying invader
+        self.strips = {}  # (row, design) -> pre-rendered row
+        self.update_bounds()
+
+    @property
+    def count(self):
+        return self.alive_count + len(self.dying)
+
+    def dying_rects(self):
+        return [
+            pygame.Rect(x, y, *swarm_sprite(enemy_type, 0, 0).get_size())
+            for x, y, enemy_type, _, _ in self.dying
+        ]
+
+    def update_bounds(self):
+        live = self.row_count > 0
+        rects = self.dying_rects()
+        if live.any():
+            lefts = self.origin_x[live] + self.first_col[live] * SWARM_SPACING_X
+            rights = (
+                self.origin_x[live]
+                + self.last_col[live] * SWARM_SPACING_X
+                + self.widths[live]
+            )
+            tops = self.origin_y[live]
+            bottoms = tops + self.heights[live]
+            left, top = int(lefts.min()), int(tops.min())
+            rects.append(
+                pygame.Rect(
+                    left, top, int(rights.max()) - left, int(bottoms.max()) - top
+                )
+            )
+        self.bounds = rects[0].unionall(rects[1:]) if rects else None
+
+    def update_row(self, row):
+        cols = np.flatnonzero(self.alive[row])
+        self.row_count[row] = len(cols)
+        if len(cols):
+            self.first_col[row] = cols[0]
+            self.last_col[row] = cols[-1]
+        self.strips.pop((row, 0), None)
+        self.strips.pop((row, 1), None)
+
+    def update(self):
+        current_time = self.clock.get_ticks()
+        self.moved = False
+        self.move()
+
+        if current_time - self.animation_time > self.animation_delay:
+            self.animation_time = current_time
+            self.design = 1 - self.design
+
+        self.shoot()
+
+        if self.dying:
+            for entry in self.dying:
+                entry[4] += 1
+            finished = len(self.dying)
+            self.dying = [entry for entry in self.dying if entry[4] < DEATH_FRAMES]
+            if len(self.dying) != finished:
+                self.update_bounds()
+
+    def move(self):
+        current_time = self.clock.get_ticks()
+        if current_time - self.move_time > self.move_delay:
+            self.move_time = current_time
+            start = self.current_moving_row
+            stop = min(start + self.band, self.num_rows)
+            self.current_moving_row = stop % self.num_rows
+            self.move_rows(start, stop)
+            self.play_move_sound()
+
+    def move_rows(self, start, stop):
+        rows = np.arange(start, stop)
+        rows = rows[self.row_count[rows] > 0]
+        if not len(rows):
+            return
+
+        # Flip and drop the whole swarm if any row in the band is at an edge
+        move_down = False
+        if self.direction > 0:
+            rights = (
+                self.origin_x[rows]
+                + self.last_col[rows] * SWARM_SPACING_X
+                + self.widths[rows]
+            )
+            move_down = bool((rights >= WIDTH - 10).any())
+        else:
+            lefts = self.origin_x[rows] + self.first_col[rows] * SWARM_SPACING_X
+            move_down = bool((lefts <= 10).any())
+        if move_down:
+            self.direction *= -1
+
+        self.origin_x[rows] += int(self.speed * self.direction)
+        if move_down:
+            self.origin_y += SWARM_DROP
+        self.update_bounds()
+        self.moved = True
+
+    def shoot(self):
+        current_time = self.clock.get_ticks()
+        if current_time - self.last_shot > self.shoot_delay:
+            # Only the lowest invader in each column can fire
+            columns = np.flatnonzero(self.alive.any(axis=0))
+            if len(columns):
+                lowest = self.num_rows - 1 - self.alive[::-1].argmax(axis=0)
+                shooters = self.rng.shots.sample(
+                    columns.tolist(), min(SWARM_VOLLEY, len(columns))
+                )
+                for col in shooters:
+                    row = lowest[col]
+                    x = self.origin_x[row] + col * SWARM_SPACING_X
+                    self.bullets.spawn(
+                        int(x + self.widths[row] // 2),
+                        int(self.origin_y[row] + self.heights[row]),
+                        1,
+                    )
+                self.last_shot = current_time
+
+    def strip(self, row):
+        key = (row, self.design)
+        image = self.strips.get(key)
+        if image is None:
+            sprite = swarm_sprite(self.row_type[row], self.design, 0)
+            width = (self.num_cols - 1) * SWARM_SPACING_X + sprite.get_width()
+            image = pygame.Surface((width, sprite.get_height()), pygame.SRCALPHA)
+            image.blits(
+                [
+                    (sprite, (col * SWARM_SPACING_X, 0))
+                    for col in np.flatnonzero(self.alive[row]).tolist()
+                ],
+                doreturn=False,
+            )
+            self.strips[key] = image
+        return image
+
+    def draw(self, screen):
+        blits = [
+            (self.strip(row), (int(self.origin_x[row]), int(self.origin_y[row])))
+            for row in np.flatnonzero(self.row_count).tolist()
+        ]
+        blits += [
+            (swarm_sprite(enemy_type, design, frame), (x, y))
+            for x, y, enemy_type, design, frame in self.dying
+        ]
+        screen.blits(blits, doreturn=False)
+
+    def hit_test(self, rect):
+        # (row, col) of the first live invader overlapping rect, row-major
+        candidates = np.flatnonzero(
+            (self.row_count > 0)
+            & (self.origin_y < rect.bottom)
+            & (self.origin_y + self.heights > rect.top)
+        )
+        for row in candidates.tolist():
+            width = int(self.widths[row])
+            offset = int(self.origin_x[row])
+            first = max(
+                (rect.left - offset - width) // SWARM_SPACING_X + 1,
+                int(self.first_col[row]),
+            )
+            last = min(
+                (rect.right - offset - 1) // SWARM_SPACING_X, int(self.last_col[row])
+            )
+            if first > last:
+                continue
+            hits = np.flatnonzero(self.alive[row, first : last + 1])
+            if len(hits):
+                return row, first + int(hits[0])
+        return None
+
+    def check_collision(self, bullet_rect):
+        hit = self.hit_test(bullet_rect)
+        if hit:
+            row, col = hit
+            self.alive[row, col] = False
+            self.alive_count -= 1
+            self.dying.append(
+                [
+                    int(self.origin_x[row]) + col * SWARM_SPACING_X,
+                    int(self.origin_y[row]),
+                    int(self.row_type[row]),
+                    self.design,
+                    0,
+                ]
+            )
+            self.update_row(row)
+            self.update_bounds()
+        return hit
+
+    def has_reached_bottom(self):
+        return self.bounds is not None and self.bounds.bottom >= HEIGHT - 50
+
+    def has_hit_player(self, player):
+        if self.bounds is None or not self.bounds.colliderect(player.rect):
+            return False
+        return self.reaches(player.rect)
+
+    def reaches(self, rect):
+        # Unlike hit_test, invaders in their death animation count, as they
+        # do for EnemyFleet: one dying on top of the player still lands
+        if self.hit_test(rect) is not None:
+            return True
+        return rect.collidelist(self.dying_rects()) != -1
+
+    def play_move_sound(self):
+        AUDIO.play(self.rng.sounds.choice(ENEMY_MOVE_SOUNDS))
+
+    def check_barrier_collisions(self, barriers):
+        for barrier in barriers:
+            reach = barrier.rect.inflate(2, 2)
+            rows = np.flatnonzero(
+                (self.row_count > 0)
+                & (self.origin_y < reach.bottom)
+                & (self.origin_y + self.heights > reach.top)
+            )
+            for row in rows.tolist():
+                width = int(self.widths[row])
+                height = int(self.heights[row])
+                offset = int(self.origin_x[row])
+                y = int(self.origin_y[row])
+                first = max((reach.left - offset - width) // SWARM_SPACING_X + 1, 0)
+                last = min(
+                    (reach.right - offset - 1) // SWARM_SPACING_X, self.num_cols - 1
+                )
+                for col in range(first, last + 1):
+                    if self.alive[row, col]:
+                        barrier.check_collision(
+                            pygame.Rect(
+                                offset + col * SWARM_SPACING_X, y, width, height
+                            )
+                        )
+
+    def remove_all_but_one(self):
+        rows, cols = np.nonzero(self.alive)
+        if len(rows):
+            row, col = rows[-1], cols[-1]
+            self.alive[:] = False
+            self.alive[row, col] = True
+            self.alive_count = 1
+            self.dying = []
+            for index in range(self.num_rows):
+                self.update_row(index)
+            self.update_bounds()
+            self.current_moving_row = 0
+
+    def clear_all_enemies(self):
+        self.alive[:] = False
+        self.alive_count = 0
+        self.dying = []
+        for index in range(self.num_rows):
+            self.update_row(index)
+        self.update_bounds()
+        self.bullets.clear()
+        self.current_moving_row = 0
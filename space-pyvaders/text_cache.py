@@ -0,0 +1,69 @@
+from collections import OrderedDict
+import pygame
+
+
+class TextCache:
+    # Rendered text surfaces keyed by (font, text, color, antialias) with
+    # least-recently-used eviction. Surfaces are shared; never draw on them.
+
+    def __init__(self, capacity=128):
+        self.capacity = capacity
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, color, antialias)
+        image = self.surfaces.get(key)
+        if image is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return image
+
+        self.misses += 1
+        image = font.render(text, antialias, color)
+        self.surfaces[key] = image
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return image
+
+
+class GlyphAtlas:
+    # For text that changes often, like counters: each character is
+    # rasterised once and strings are put together from those glyphs, so a
+    # new value costs a few blits instead of a font render, and doesn't
+    # churn the TextCache. The last string is kept for unchanged frames.
+
+    def __init__(self, font, color, antialias=True):
+        self.font = font
+        self.color = color
+        self.antialias = antialias
+        self.glyphs = {}
+        self.height = font.get_height()
+        self.last_text = None
+        self.last_image = None
+
+    def glyph(self, char):
+        image = self.glyphs.get(char)
+        if image is None:
+            image = self.glyphs[char] = self.font.render(
+                char, self.antialias, self.color
+            )
+        return image
+
+    def render(self, text):
+        if text == self.last_text:
+            return self.last_image
+        glyphs = [self.glyph(char) for char in text]
+        width = sum(glyph.get_width() for glyph in glyphs)
+        image = pygame.Surface((width, self.height), pygame.SRCALPHA)
+        x = 0
+        for glyph in glyphs:
+            image.blit(glyph, (x, 0))
+            x += glyph.get_width()
+        self.last_text = text
+        self.last_image = image
+        return image
+
+
+TEXT_CACHE = TextCache()
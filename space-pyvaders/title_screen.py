@@ -1,22 +1,24 @@
 import pygame
 from constants import *
+from text_cache import TEXT_CACHE
+from assets import ASSETS
+from frame_pacer import FramePacer
 
 
 class TitleScreen:
     def __init__(self, screen):
         self.screen = screen
-        self.font = pygame.font.Font(FONT_PATH, 36)
-        self.big_font = pygame.font.Font(FONT_PATH, 72)
-        self.small_font = pygame.font.Font(
-            FONT_PATH, 24
-        )  # Add this line for the smaller font
+        self.font = ASSETS.font(36)
+        self.big_font = ASSETS.font(72)
+        self.small_font = ASSETS.font(24)  # Add this line for the smaller font
         self.menu_items = ["1 PLAYER GAME", "2 PLAYER GAME", "OPTIONS", "QUIT"]
         self.selected_item = 0
         self.sfx_volume = 5
+        self.text_cache = TEXT_CACHE
 
     def draw_3d_text(self, text, x, y, color, shadow_color, offset=4):
-        shadow_surf = self.big_font.render(text, True, shadow_color)
-        text_surf = self.big_font.render(text, True, color)
+        shadow_surf = self.text_cache.render(self.big_font, text, shadow_color)
+        text_surf = self.text_cache.render(self.big_font, text, color)
         self.screen.blit(shadow_surf, (x + offset, y + offset))
         self.screen.blit(text_surf, (x, y))
 
@@ -30,7 +32,7 @@ class TitleScreen:
         # Draw menu items
         for i, item in enumerate(self.menu_items):
             color = YELLOW if i == self.selected_item else WHITE
-            text = self.font.render(item, True, color)
+            text = self.text_cache.render(self.font, item, color)
             self.screen.blit(text, (WIDTH // 2 - text.get_width() // 2, 300 + i * 60))
 
         pygame.display.flip()
@@ -47,27 +49,32 @@ class TitleScreen:
                 elif event.key == pygame.K_RETURN:
                     if self.menu_items[self.selected_item] == "1 PLAYER GAME":
                         return "START_GAME"
+                    elif self.menu_items[self.selected_item] == "2 PLAYER GAME":
+                        return "TWO_PLAYER_GAME"
                     elif self.menu_items[self.selected_item] == "OPTIONS":
                         return "OPTIONS"
                     elif self.menu_items[self.selected_item] == "QUIT":
                         return "QUIT"
         return None
 
-    def run_options(self):
+    async def run_options(self):
+        pacer = FramePacer()
         running = True
         while running:
             self.screen.fill(BLACK)
-            title = self.font.render("OPTIONS", True, WHITE)
+            title = self.text_cache.render(self.font, "OPTIONS", WHITE)
             self.screen.blit(title, (WIDTH // 2 - title.get_width() // 2, 100))
 
             # Add the "PRESS ESC TO RETURN" text
-            return_text = self.small_font.render("PRESS ESC TO RETURN", True, WHITE)
+            return_text = self.text_cache.render(
+                self.small_font, "PRESS ESC TO RETURN", WHITE
+            )
             self.screen.blit(
                 return_text, (WIDTH // 2 - return_text.get_width() // 2, 150)
             )
 
-            volume_text = self.font.render(
-                f"SFX Volume: {self.sfx_volume}", True, WHITE
+            volume_text = self.text_cache.render(
+                self.font, f"SFX Volume: {self.sfx_volume}", WHITE
             )
             self.screen.blit(
                 volume_text, (WIDTH // 2 - volume_text.get_width() // 2, 300)
@@ -86,20 +93,26 @@ class TitleScreen:
                     elif event.key == pygame.K_RIGHT:
                         self.sfx_volume = min(10, self.sfx_volume + 1)
 
+            await pacer.tick(60)
+
         return None
 
-    def run(self):
-        clock = pygame.time.Clock()
+    async def run(self):
+        pacer = FramePacer()
         running = True
+        self.draw()
+        ASSETS.first_frame_shown()
         while running:
-            self.draw()
             action = self.handle_events()
             if action == "QUIT":
                 return "QUIT"
             elif action == "START_GAME":
                 return "START_GAME"
+            elif action == "TWO_PLAYER_GAME":
+                return "TWO_PLAYER_GAME"
             elif action == "OPTIONS":
-                options_result = self.run_options()
+                options_result = await self.run_options()
                 if options_result == "QUIT":
                     return "QUIT"
-            clock.tick(60)
+            await pacer.tick(60)
+            self.draw()